@@ -0,0 +1,21 @@
+"""Gunicorn configuration for the AI Text-to-JSON Extraction System.
+
+Run with: gunicorn -c gunicorn.conf.py app:app
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+
+# /extract blocks on OpenAI HTTP calls, so use threaded workers to keep many
+# extractions in flight per process.
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Complex schemas can take a while to extract
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+
+# Don't preload: each worker imports the app after fork so API clients and
+# their connection pools are never shared across processes.
+preload_app = False
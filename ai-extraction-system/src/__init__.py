@@ -1,27 +1,60 @@
 """AI Text-to-JSON Extraction System."""
 
+import importlib
+
 from .schema_analyzer import SchemaAnalyzer
-from .extraction_engine import ExtractionEngine
+from .extraction_cache import ExtractionCache
+from .rate_limiter import RateLimiter
 from .document_processor import DocumentProcessor
 from .confidence_scorer import ConfidenceScorer
 from .utils import (
-    count_tokens, estimate_schema_tokens, validate_json_against_schema,
-    flatten_schema, calculate_schema_depth, count_schema_objects,
-    count_enum_values, merge_dicts_deep
+    count_tokens, count_tokens_batch, estimate_schema_tokens, canonical_json, indented_json, parse_json,
+    get_schema_validator, validate_json_against_schema, flatten_schema, get_flattened_schema,
+    get_schema_json, get_schema_fingerprint, calculate_schema_depth, count_schema_objects, count_enum_values, schema_metrics,
+    merge_dicts_deep, merge_dicts_deep_into
 )
 
+# These pull in the OpenAI client, most of the package's import time, so
+# they are imported on first access rather than with the package
+_LAZY_IMPORTS = {
+    "ExtractionEngine": ".extraction_engine",
+    "ExtractionPipeline": ".pipeline"
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __version__ = "1.0.0"
 __all__ = [
     "SchemaAnalyzer",
     "ExtractionEngine", 
+    "ExtractionCache",
+    "RateLimiter",
     "DocumentProcessor",
     "ConfidenceScorer",
+    "ExtractionPipeline",
     "count_tokens",
+    "count_tokens_batch",
     "estimate_schema_tokens",
+    "canonical_json",
+    "indented_json",
+    "parse_json",
+    "get_schema_validator",
     "validate_json_against_schema",
     "flatten_schema",
+    "get_flattened_schema",
+    "get_schema_json",
+    "get_schema_fingerprint",
     "calculate_schema_depth",
     "count_schema_objects",
     "count_enum_values",
-    "merge_dicts_deep"
+    "schema_metrics",
+    "merge_dicts_deep",
+    "merge_dicts_deep_into"
 ]
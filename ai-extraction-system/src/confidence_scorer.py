@@ -1,10 +1,216 @@
 """Confidence Scoring System for extraction results."""
+import operator
 import os
-from typing import Dict, List, Any, Tuple
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, Dict, FrozenSet, List, Any, NamedTuple, Optional, Tuple
 try:
-    from utils import validate_json_against_schema, flatten_schema, get_nested_value
+    from utils import (
+        validate_json_against_schema, get_flattened_schema, IdentityCache
+    )
 except ImportError:
-    from .utils import validate_json_against_schema, flatten_schema, get_nested_value
+    from .utils import (
+        validate_json_against_schema, get_flattened_schema, IdentityCache
+    )
+
+# Distinguishes fields absent from a result from fields extracted as null
+_MISSING = object()
+
+
+@lru_cache(maxsize=1024)
+def _compile_pattern(pattern: str) -> Optional[re.Pattern]:
+    """Compile a schema pattern once; invalid patterns compile to None."""
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return None
+
+
+def _build_enum_lookup(enum_values: list) -> Tuple[list, Optional[FrozenSet], FrozenSet[str]]:
+    """
+    Build set forms of an enum alongside the enum itself.
+    
+    Returns (enum values, exact values or None if unhashable, lowercased strings).
+    """
+    try:
+        exact = frozenset(enum_values)
+    except TypeError:
+        exact = None
+    lowered = frozenset(value.lower() for value in enum_values if isinstance(value, str))
+    return enum_values, exact, lowered
+
+
+# Keyed on the schema's enum list object, which is reused for every result
+_enum_lookups = IdentityCache(_build_enum_lookup, maxsize=1024)
+
+
+def _enum_lookup(schema: dict) -> Optional[Tuple[list, Optional[FrozenSet], FrozenSet[str]]]:
+    """Get the prepared enum lookup for a field schema, or None if it has no enum."""
+    if 'enum' not in schema:
+        return None
+    return _enum_lookups(schema['enum'])
+
+# Review tiers: confidences below each threshold fall into that tier, and
+# anything at or above the last one into the final tier
+_REVIEW_THRESHOLDS = (0.3, 0.5, 0.7)
+_REVIEW_REASONS = (
+    "Very low confidence - likely extraction error",
+    "Low confidence - validation failed",
+    "Medium confidence - may need verification",
+    "Below threshold - minor issues detected",
+)
+_REVIEW_PRIORITIES = ("high", "medium", "low", "low")
+
+# Schema 'type' names interned to indexes into _TYPE_TUPLES. Unknown type
+# names get the empty tuple, which no value is an instance of.
+_TYPE_CODES = {
+    'string': 0,
+    'number': 1,
+    'integer': 2,
+    'boolean': 3,
+    'array': 4,
+    'object': 5,
+    'null': 6,
+}
+_TYPE_TUPLES = (
+    (str,),
+    (int, float),
+    (int,),
+    (bool,),
+    (list,),
+    (dict,),
+    (type(None),),
+    (),
+)
+_UNKNOWN_TYPE = len(_TYPE_TUPLES) - 1
+_NO_TYPE = -1
+_STRING_TYPE = _TYPE_CODES['string']
+
+
+def _type_code(schema: dict) -> int:
+    """Intern a field schema's 'type' to a _TYPE_TUPLES index (_NO_TYPE if unset)."""
+    expected_type = schema.get('type')
+    if not expected_type:
+        return _NO_TYPE
+    return _TYPE_CODES.get(expected_type, _UNKNOWN_TYPE)
+
+
+# (keyword, violation test) pairs for numeric range checks
+_RANGE_BOUNDS = (
+    ('minimum', operator.lt),
+    ('maximum', operator.gt),
+    ('exclusiveMinimum', operator.le),
+    ('exclusiveMaximum', operator.ge),
+)
+_LENGTH_BOUNDS = (
+    ('minLength', operator.lt),
+    ('maxLength', operator.gt),
+)
+
+
+def _pattern_check(schema: dict) -> Optional[Callable[[Any], float]]:
+    """Build the pattern check for a field, or None if it has no usable pattern."""
+    if 'pattern' not in schema:
+        return None
+    pattern = _compile_pattern(schema['pattern'])
+    if pattern is None:
+        return None  # Invalid pattern, don't penalize
+    
+    def check(value: Any) -> float:
+        if not isinstance(value, str):
+            return 1.0
+        # JSON Schema patterns are unanchored, matching how the validator applies them
+        return 1.0 if pattern.search(value) else 0.4
+    return check
+
+
+def _range_check(schema: dict) -> Optional[Callable[[Any], float]]:
+    """Build the numeric range check for a field, or None if it sets no bounds."""
+    bounds = tuple((schema[key], violates) for key, violates in _RANGE_BOUNDS if key in schema)
+    if not bounds:
+        return None
+    
+    def check(value: Any) -> float:
+        if not isinstance(value, (int, float)):
+            return 1.0
+        score = 1.0
+        for bound, violates in bounds:
+            if violates(value, bound):
+                score *= 0.3
+        return score
+    return check
+
+
+def _length_check(schema: dict) -> Optional[Callable[[Any], float]]:
+    """Build the string/array length check for a field, or None if it sets no limits."""
+    bounds = tuple((schema[key], violates) for key, violates in _LENGTH_BOUNDS if key in schema)
+    if not bounds:
+        return None
+    
+    def check(value: Any) -> float:
+        if not isinstance(value, (str, list)):
+            return 1.0
+        length = len(value)
+        score = 1.0
+        for bound, violates in bounds:
+            if violates(length, bound):
+                score *= 0.5
+        return score
+    return check
+
+
+def _compile_value_checks(field_schema: dict) -> Tuple[Callable[[Any], float], ...]:
+    """
+    Resolve a field schema's pattern, range and length constraints once.
+    
+    Only the checks the schema actually constrains are returned, in scoring
+    order, with their patterns and bounds already bound in.
+    """
+    checks = (_pattern_check(field_schema), _range_check(field_schema), _length_check(field_schema))
+    return tuple(check for check in checks if check is not None)
+
+
+class _PlannedField(NamedTuple):
+    """A flattened schema field with everything scoring needs resolved up front."""
+    path: str
+    parent_keys: Tuple[str, ...]  # Shared by sibling fields within one plan
+    key: str
+    required: bool
+    type_code: int
+    enum_lookup: Optional[tuple]
+    value_checks: tuple
+
+
+def _plan_fields(schema: dict) -> Tuple[_PlannedField, ...]:
+    """Pair every flattened field of a schema with its prepared path, flags and checks."""
+    parents = {}
+    plan = []
+    for field_path, field_schema in get_flattened_schema(schema).items():
+        *parent_keys, key = field_path.split('.')
+        parent_keys = parents.setdefault(tuple(parent_keys), tuple(parent_keys))
+        plan.append(_PlannedField(
+            field_path, parent_keys, key, bool(field_schema.get('required', False)),
+            _type_code(field_schema), _enum_lookup(field_schema), _compile_value_checks(field_schema)
+        ))
+    return tuple(plan)
+
+
+def _resolve_parent(data: Any, keys: Tuple[str, ...]) -> Any:
+    """Walk a key path the way get_nested_value does; None if it leaves the dicts."""
+    for key in keys:
+        if isinstance(data, dict) and key in data:
+            data = data[key]
+        else:
+            return None
+    return data
+
+
+# Compiled once per schema object (or field schema, for score_field) and
+# reused for every result scored against it
+_field_plans = IdentityCache(_plan_fields)
+_field_checks = IdentityCache(_compile_value_checks, maxsize=4096)
 
 
 class ConfidenceScorer:
@@ -30,14 +236,11 @@ class ConfidenceScorer:
         # Validate against schema
         is_valid, validation_error = validate_json_against_schema(result, schema)
         
-        # Calculate field-level confidence scores
-        field_scores = self._calculate_field_scores(result, schema, original_text)
-        
-        # Calculate completion metrics
-        completion_metrics = self._calculate_completion_metrics(result, schema)
-        
-        # Calculate consistency scores
-        consistency_scores = self._calculate_consistency_scores(result, schema)
+        # Compiled once per distinct schema; every field is then visited once
+        # to collect field scores, completion and consistency counts together
+        field_scores, completion_metrics, consistency_scores = self._score_all_fields(
+            result, schema, _field_plans(schema), original_text
+        )
         
         # Calculate overall confidence
         overall_confidence = self._calculate_overall_confidence(
@@ -73,8 +276,6 @@ class ConfidenceScorer:
         if extraction_context is None:
             extraction_context = {}
         
-        confidence = 1.0
-        
         # Check if field exists
         if field_value is None:
             if field_schema.get('required', False):
@@ -82,28 +283,12 @@ class ConfidenceScorer:
             else:
                 return 0.5  # Optional field missing
         
-        # Data type validation
-        confidence *= self._score_data_type(field_value, field_schema)
-        
-        # Enum validation
-        confidence *= self._score_enum_match(field_value, field_schema)
-        
-        # Pattern validation
-        confidence *= self._score_pattern_match(field_value, field_schema)
-        
-        # Range validation
-        confidence *= self._score_range_validation(field_value, field_schema)
-        
-        # Length validation
-        confidence *= self._score_length_validation(field_value, field_schema)
-        
-        # Context relevance (if available)
-        if 'original_text' in extraction_context:
-            confidence *= self._score_context_relevance(
-                field_value, extraction_context['original_text']
-            )
-        
-        return max(0.0, min(1.0, confidence))
+        return self._score_value(
+            field_value, _field_checks(field_schema),
+            self._score_data_type(field_value, _type_code(field_schema)),
+            self._score_enum_match(field_value, _enum_lookup(field_schema)),
+            (extraction_context.get('original_text') or '').lower()
+        )
     
     def get_review_candidates(self, field_scores: dict, threshold: float = None) -> List[dict]:
         """
@@ -119,97 +304,119 @@ class ConfidenceScorer:
         if threshold is None:
             threshold = self.confidence_threshold
         
-        review_candidates = []
-        
-        for field_path, score in field_scores.items():
-            if score < threshold:
-                review_candidates.append({
-                    'field': field_path,
-                    'confidence': score,
-                    'reason': self._get_review_reason(score),
-                    'priority': self._get_review_priority(score)
-                })
-        
-        # Sort by priority (lowest confidence first)
-        review_candidates.sort(key=lambda x: x['confidence'])
-        
-        return review_candidates
-    
-    def _calculate_field_scores(self, result: dict, schema: dict, original_text: str) -> dict:
-        """Calculate confidence scores for all fields."""
-        field_scores = {}
-        flattened_schema = flatten_schema(schema)
+        # Sort the below-threshold (field, score) pairs by priority (lowest
+        # confidence first) before building a dict for each candidate
+        below_threshold = sorted(
+            (item for item in field_scores.items() if item[1] < threshold),
+            key=itemgetter(1)
+        )
         
-        for field_path, field_schema in flattened_schema.items():
-            field_value = get_nested_value(result, field_path)
-            
-            extraction_context = {
-                'original_text': original_text,
-                'schema': field_schema,
-                'full_result': result
+        return [
+            {
+                'field': field_path,
+                'confidence': score,
+                'reason': self._get_review_reason(score),
+                'priority': self._get_review_priority(score)
             }
-            
-            field_scores[field_path] = self.score_field(
-                field_value, field_schema, extraction_context
-            )
-        
-        return field_scores
+            for field_path, score in below_threshold
+        ]
     
-    def _calculate_completion_metrics(self, result: dict, schema: dict) -> dict:
-        """Calculate completion metrics for the extraction."""
-        flattened_schema = flatten_schema(schema)
+    def _score_all_fields(self, result: dict, schema: dict, field_plan: tuple,
+                          original_text: str) -> Tuple[dict, dict, dict]:
+        """
+        Score every schema field in a single pass over the compiled field plan.
         
-        total_fields = len(flattened_schema)
+        Returns:
+            (field_scores, completion_metrics, consistency_scores)
+        """
+        # Lowercased once for every field's context relevance check
+        text_lower = original_text.lower()
+        field_scores = {}
         completed_fields = 0
         required_fields = 0
         completed_required = 0
-        
-        for field_path, field_schema in flattened_schema.items():
-            field_value = get_nested_value(result, field_path)
-            is_required = field_schema.get('required', False)
+        # Type/enum consistency only consider leaf values present in the result
+        typed_fields = 0
+        consistent_types = 0
+        enum_fields = 0
+        consistent_enums = 0
+        
+        # Flattened fields come in schema order, so siblings are consecutive
+        # and share one walk down to their parent object
+        last_parent_keys = None
+        parent = None
+        
+        for (field_path, parent_keys, key, is_required, type_code,
+             enum_lookup, value_checks) in field_plan:
+            if parent_keys is not last_parent_keys:
+                parent = _resolve_parent(result, parent_keys)
+                last_parent_keys = parent_keys
+            field_value = parent.get(key, _MISSING) if isinstance(parent, dict) else _MISSING
+            present = field_value is not _MISSING and not isinstance(field_value, dict)
+            if field_value is _MISSING:
+                field_value = None
             
             if is_required:
                 required_fields += 1
-                if field_value is not None:
-                    completed_required += 1
             
-            if field_value is not None:
+            if field_value is None:
+                field_scores[field_path] = 0.0 if is_required else 0.5
+                type_score = self._score_data_type(None, type_code) if present else None
+                enum_score = self._score_enum_match(None, enum_lookup) if present else None
+            else:
                 completed_fields += 1
+                if is_required:
+                    completed_required += 1
+                type_score = self._score_data_type(field_value, type_code)
+                enum_score = self._score_enum_match(field_value, enum_lookup)
+                field_scores[field_path] = self._score_value(
+                    field_value, value_checks, type_score, enum_score, text_lower
+                )
+            
+            if present:
+                typed_fields += 1
+                if type_score >= 0.8:
+                    consistent_types += 1
+                if enum_lookup is not None:
+                    enum_fields += 1
+                    if enum_score >= 0.8:
+                        consistent_enums += 1
         
-        completion_rate = completed_fields / total_fields if total_fields > 0 else 0.0
-        required_completion_rate = completed_required / required_fields if required_fields > 0 else 1.0
-        
-        return {
+        total_fields = len(field_plan)
+        completion_metrics = {
             'total_fields': total_fields,
             'completed_fields': completed_fields,
             'required_fields': required_fields,
             'completed_required': completed_required,
-            'completion_rate': completion_rate,
-            'required_completion_rate': required_completion_rate
+            'completion_rate': completed_fields / total_fields if total_fields > 0 else 0.0,
+            'required_completion_rate': completed_required / required_fields if required_fields > 0 else 1.0
         }
-    
-    def _calculate_consistency_scores(self, result: dict, schema: dict) -> dict:
-        """Calculate consistency scores across the extraction."""
-        flattened_result = self._flatten_dict(result)
-        flattened_schema = flatten_schema(schema)
-        
-        # Type consistency
-        type_consistency = self._calculate_type_consistency(flattened_result, flattened_schema)
         
-        # Enum consistency
-        enum_consistency = self._calculate_enum_consistency(flattened_result, flattened_schema)
-        
-        # Cross-field consistency
+        type_consistency = consistent_types / typed_fields if typed_fields > 0 else 1.0
+        enum_consistency = consistent_enums / enum_fields if enum_fields > 0 else 1.0
         cross_field_consistency = self._calculate_cross_field_consistency(result, schema)
-        
-        overall_consistency = (type_consistency + enum_consistency + cross_field_consistency) / 3
-        
-        return {
+        consistency_scores = {
             'type_consistency': type_consistency,
             'enum_consistency': enum_consistency,
             'cross_field_consistency': cross_field_consistency,
-            'overall': overall_consistency
+            'overall': (type_consistency + enum_consistency + cross_field_consistency) / 3
         }
+        
+        return field_scores, completion_metrics, consistency_scores
+    
+    def _score_value(self, value: Any, value_checks: tuple, type_score: float, enum_score: float,
+                     text_lower: str) -> float:
+        """Combine the per-check scores for a non-null field value."""
+        # Data type and enum validation (computed by the caller, which reuses them)
+        confidence = type_score * enum_score
+        
+        # Pattern, range and length validation, for the constraints the field sets
+        for check in value_checks:
+            confidence *= check(value)
+        
+        # Context relevance (neutral without source text). Every factor is
+        # within [0, 1] and none is ever 0, so the product needs no clamping.
+        return confidence * self._score_context_relevance(value, text_lower)
     
     def _calculate_overall_confidence(self, field_scores: dict, completion_metrics: dict, 
                                     consistency_scores: dict, is_schema_valid: bool) -> float:
@@ -242,106 +449,47 @@ class ConfidenceScorer:
         
         return max(0.0, min(1.0, overall))
     
-    def _score_data_type(self, value: Any, schema: dict) -> float:
-        """Score data type correctness."""
-        expected_type = schema.get('type')
-        if not expected_type:
+    def _score_data_type(self, value: Any, type_code: int) -> float:
+        """Score data type correctness against an interned schema type."""
+        if type_code < 0:
             return 1.0
         
-        type_mapping = {
-            'string': str,
-            'number': (int, float),
-            'integer': int,
-            'boolean': bool,
-            'array': list,
-            'object': dict,
-            'null': type(None)
-        }
-        
-        expected_python_type = type_mapping.get(expected_type)
-        if expected_python_type and isinstance(value, expected_python_type):
+        if isinstance(value, _TYPE_TUPLES[type_code]):
             return 1.0
         
         # Partial credit for compatible types
-        if expected_type == 'number' and isinstance(value, int):
-            return 1.0
-        if expected_type == 'string' and isinstance(value, (int, float, bool)):
+        if type_code == _STRING_TYPE and isinstance(value, (int, float, bool)):
             return 0.8  # Can be converted to string
         
         return 0.3
     
-    def _score_enum_match(self, value: Any, schema: dict) -> float:
-        """Score enum value matching."""
-        if 'enum' not in schema:
+    def _score_enum_match(self, value: Any, enum_lookup: Optional[tuple]) -> float:
+        """Score enum value matching against a prepared enum lookup."""
+        if enum_lookup is None:
             return 1.0
         
-        enum_values = schema['enum']
-        if value in enum_values:
+        enum_values, exact, lowered = enum_lookup
+        try:
+            matched = value in exact if exact is not None else value in enum_values
+        except TypeError:
+            # Unhashable values (lists, objects) fall back to a linear scan
+            matched = value in enum_values
+        if matched:
             return 1.0
         
         # Check for case-insensitive match for strings
-        if isinstance(value, str):
-            for enum_val in enum_values:
-                if isinstance(enum_val, str) and value.lower() == enum_val.lower():
-                    return 0.9
+        if isinstance(value, str) and value.lower() in lowered:
+            return 0.9
         
         return 0.2
     
-    def _score_pattern_match(self, value: Any, schema: dict) -> float:
-        """Score pattern matching for strings."""
-        if 'pattern' not in schema or not isinstance(value, str):
-            return 1.0
-        
-        import re
-        try:
-            if re.match(schema['pattern'], value):
-                return 1.0
-            else:
-                return 0.4
-        except re.error:
-            return 1.0  # Invalid pattern, don't penalize
-    
-    def _score_range_validation(self, value: Any, schema: dict) -> float:
-        """Score numeric range validation."""
-        if not isinstance(value, (int, float)):
-            return 1.0
-        
-        score = 1.0
-        
-        if 'minimum' in schema and value < schema['minimum']:
-            score *= 0.3
-        if 'maximum' in schema and value > schema['maximum']:
-            score *= 0.3
-        if 'exclusiveMinimum' in schema and value <= schema['exclusiveMinimum']:
-            score *= 0.3
-        if 'exclusiveMaximum' in schema and value >= schema['exclusiveMaximum']:
-            score *= 0.3
-        
-        return score
-    
-    def _score_length_validation(self, value: Any, schema: dict) -> float:
-        """Score length validation for strings and arrays."""
-        if not isinstance(value, (str, list)):
-            return 1.0
-        
-        length = len(value)
-        score = 1.0
-        
-        if 'minLength' in schema and length < schema['minLength']:
-            score *= 0.5
-        if 'maxLength' in schema and length > schema['maxLength']:
-            score *= 0.5
-        
-        return score
-    
-    def _score_context_relevance(self, value: Any, original_text: str) -> float:
-        """Score how relevant the extracted value is to the original text."""
-        if not isinstance(value, str) or not original_text:
+    def _score_context_relevance(self, value: Any, text_lower: str) -> float:
+        """Score how relevant the extracted value is to the (lowercased) original text."""
+        if not isinstance(value, str) or not text_lower:
             return 1.0
         
         # Simple relevance check: is the value mentioned in the text?
-        value_lower = str(value).lower()
-        text_lower = original_text.lower()
+        value_lower = value.lower()
         
         if value_lower in text_lower:
             return 1.0
@@ -354,41 +502,6 @@ class ConfidenceScorer:
         
         return 0.7  # Neutral score if no clear relevance
     
-    def _calculate_type_consistency(self, result: dict, schema: dict) -> float:
-        """Calculate type consistency across fields."""
-        if not result:
-            return 1.0
-        
-        consistent_fields = 0
-        total_fields = 0
-        
-        for field_path, value in result.items():
-            if field_path in schema:
-                field_schema = schema[field_path]
-                if self._score_data_type(value, field_schema) >= 0.8:
-                    consistent_fields += 1
-                total_fields += 1
-        
-        return consistent_fields / total_fields if total_fields > 0 else 1.0
-    
-    def _calculate_enum_consistency(self, result: dict, schema: dict) -> float:
-        """Calculate enum consistency across fields."""
-        if not result:
-            return 1.0
-        
-        consistent_fields = 0
-        enum_fields = 0
-        
-        for field_path, value in result.items():
-            if field_path in schema:
-                field_schema = schema[field_path]
-                if 'enum' in field_schema:
-                    enum_fields += 1
-                    if self._score_enum_match(value, field_schema) >= 0.8:
-                        consistent_fields += 1
-        
-        return consistent_fields / enum_fields if enum_fields > 0 else 1.0
-    
     def _calculate_cross_field_consistency(self, result: dict, schema: dict) -> float:
         """Calculate consistency between related fields."""
         # This is a simplified implementation
@@ -397,33 +510,10 @@ class ConfidenceScorer:
         # For now, return a neutral score
         return 0.8
     
-    def _flatten_dict(self, d: dict, parent_key: str = '', sep: str = '.') -> dict:
-        """Flatten nested dictionary."""
-        items = []
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.extend(self._flatten_dict(v, new_key, sep=sep).items())
-            else:
-                items.append((new_key, v))
-        return dict(items)
-    
     def _get_review_reason(self, confidence: float) -> str:
         """Get human-readable reason for review."""
-        if confidence < 0.3:
-            return "Very low confidence - likely extraction error"
-        elif confidence < 0.5:
-            return "Low confidence - validation failed"
-        elif confidence < 0.7:
-            return "Medium confidence - may need verification"
-        else:
-            return "Below threshold - minor issues detected"
+        return _REVIEW_REASONS[bisect_right(_REVIEW_THRESHOLDS, confidence)]
     
     def _get_review_priority(self, confidence: float) -> str:
         """Get review priority based on confidence."""
-        if confidence < 0.3:
-            return "high"
-        elif confidence < 0.5:
-            return "medium"
-        else:
-            return "low"
+        return _REVIEW_PRIORITIES[bisect_right(_REVIEW_THRESHOLDS, confidence)]
@@ -1,10 +1,55 @@
 """Document Processing for handling large texts and chunking."""
 import re
-from typing import List, Dict, Any, Tuple
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 try:
-    from utils import count_tokens, merge_dicts_deep
+    from utils import count_tokens, count_tokens_batch, merge_dicts_deep
 except ImportError:
-    from .utils import count_tokens, merge_dicts_deep
+    from .utils import count_tokens, count_tokens_batch, merge_dicts_deep
+
+# Sentence boundaries: terminal punctuation followed by whitespace (or line
+# breaks) and a capital letter
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z])|(?<=[.!?])\s*\n+\s*(?=[A-Z])')
+
+# Clause separators tried, in order, when a sentence alone exceeds the chunk size
+_CLAUSE_RES = tuple(
+    re.compile(pattern) for pattern in (r',\s+', r';\s+', r'\s+and\s+', r'\s+or\s+', r'\s+but\s+')
+)
+
+
+def _prefer_longer(existing_value: str, new_value: str, all_values: List[Any]) -> str:
+    """For strings, prefer the longer/more detailed value."""
+    return existing_value if len(existing_value) >= len(new_value) else new_value
+
+
+def _most_frequent(existing_value: Any, new_value: Any, all_values: List[Any]) -> Any:
+    """For numbers, use the most frequent value (earliest seen on ties)."""
+    return Counter(all_values).most_common(1)[0][0]
+
+
+def _merge_lists(existing_value: list, new_value: list, all_values: List[Any]) -> list:
+    """For lists, merge and remove duplicates while preserving order."""
+    return list(dict.fromkeys(existing_value + new_value))
+
+
+def _any_true(existing_value: bool, new_value: bool, all_values: List[Any]) -> bool:
+    """For booleans, prefer True if any chunk has True."""
+    return existing_value or new_value
+
+
+# Conflict resolvers keyed on the exact (existing, new) value types. Exact
+# types keep booleans, which subclass int, out of the numeric resolver.
+_CONFLICT_RESOLVERS = {
+    (str, str): _prefer_longer,
+    (int, int): _most_frequent,
+    (int, float): _most_frequent,
+    (float, int): _most_frequent,
+    (float, float): _most_frequent,
+    (list, list): _merge_lists,
+    (bool, bool): _any_true,
+}
 
 
 class DocumentProcessor:
@@ -57,20 +102,33 @@ class DocumentProcessor:
         Returns:
             List of chunk dictionaries with metadata
         """
+        return list(self.iter_chunks(text, max_tokens))
+    
+    def iter_chunks(self, text: str, max_tokens: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the chunks chunk_document returns, one at a time.
+        
+        Only the previous chunk is kept (for its overlap), so callers that
+        process and drop each chunk never hold the whole chunked document.
+        """
         if max_tokens is None:
             max_tokens = self.max_tokens_per_chunk
         
         # Split text into sentences for better boundary preservation
         sentences = self._split_into_sentences(text)
+        # All sentences are tokenized in one batch; overlap restarts reuse these counts
+        sentence_token_counts = count_tokens_batch(sentences)
+        sentence_offsets = self._locate_sentences(text, sentences)
         
-        chunks = []
+        previous_text = None  # Text of the last chunk yielded, for overlap
         current_chunk = []
+        current_counts = []  # Token counts of the sentences in current_chunk
         current_tokens = 0
+        chunk_start = 0  # Index of the first sentence in current_chunk
         chunk_id = 0
-        text_position = 0
         
-        for sentence in sentences:
-            sentence_tokens = count_tokens(sentence)
+        for index, sentence in enumerate(sentences):
+            sentence_tokens = sentence_token_counts[index]
             
             # If single sentence exceeds max tokens, split it further
             if sentence_tokens > max_tokens:
@@ -78,31 +136,40 @@ class DocumentProcessor:
                 if current_chunk:
                     # Finalize current chunk
                     chunk_text = ' '.join(current_chunk)
-                    chunks.append({
+                    yield {
                         'text': chunk_text,
                         'chunk_id': chunk_id,
-                        'start_pos': text_position - len(chunk_text),
-                        'end_pos': text_position,
+                        'start_pos': sentence_offsets[chunk_start][0],
+                        'end_pos': sentence_offsets[index - 1][1],
                         'token_count': current_tokens,
-                        'sentence_count': len(current_chunk)
-                    })
+                        'sentence_count': len(current_chunk),
+                        'first_sentence': current_chunk[0],
+                        'last_sentence': current_chunk[-1]
+                    }
+                    previous_text = chunk_text
                     chunk_id += 1
                     current_chunk = []
+                    current_counts = []
                     current_tokens = 0
                 
-                # Split oversized sentence
+                # Split oversized sentence; pieces are placed consecutively
+                # from the sentence's start
                 sub_chunks = self._split_oversized_sentence(sentence, max_tokens)
-                for sub_chunk in sub_chunks:
-                    chunks.append({
+                sub_position = sentence_offsets[index][0]
+                for sub_chunk, sub_tokens in zip(sub_chunks, count_tokens_batch(sub_chunks)):
+                    yield {
                         'text': sub_chunk,
                         'chunk_id': chunk_id,
-                        'start_pos': text_position,
-                        'end_pos': text_position + len(sub_chunk),
-                        'token_count': count_tokens(sub_chunk),
-                        'sentence_count': 1
-                    })
+                        'start_pos': sub_position,
+                        'end_pos': sub_position + len(sub_chunk),
+                        'token_count': sub_tokens,
+                        'sentence_count': 1,
+                        'first_sentence': sub_chunk,
+                        'last_sentence': sub_chunk
+                    }
+                    previous_text = sub_chunk
                     chunk_id += 1
-                    text_position += len(sub_chunk)
+                    sub_position += len(sub_chunk)
                 
                 continue
             
@@ -112,52 +179,59 @@ class DocumentProcessor:
                 chunk_text = ' '.join(current_chunk)
                 
                 # Add overlap from previous chunk if exists
-                overlap_text = self._get_overlap_text(chunks, chunk_text)
+                overlap_text, overlap_token_count = self._get_overlap(previous_text)
                 if overlap_text:
                     chunk_text = overlap_text + ' ' + chunk_text
                 
-                chunks.append({
+                yield {
                     'text': chunk_text,
                     'chunk_id': chunk_id,
-                    'start_pos': text_position - len(' '.join(current_chunk)),
-                    'end_pos': text_position,
-                    'token_count': count_tokens(chunk_text),
+                    'start_pos': sentence_offsets[chunk_start][0],
+                    'end_pos': sentence_offsets[index - 1][1],
+                    'token_count': current_tokens + overlap_token_count,
                     'sentence_count': len(current_chunk),
-                    'has_overlap': bool(overlap_text)
-                })
+                    'has_overlap': bool(overlap_text),
+                    'first_sentence': current_chunk[0],
+                    'last_sentence': current_chunk[-1]
+                }
+                previous_text = chunk_text
                 
                 chunk_id += 1
                 
                 # Start new chunk with overlap sentences
                 overlap_sentences = self._get_overlap_sentences(current_chunk)
+                current_counts = current_counts[len(current_counts) - len(overlap_sentences):]
                 current_chunk = overlap_sentences
-                current_tokens = sum(count_tokens(s) for s in overlap_sentences)
+                current_tokens = sum(current_counts)
+                chunk_start = index - len(overlap_sentences)
             
             # Add sentence to current chunk
+            if not current_chunk:
+                chunk_start = index
             current_chunk.append(sentence)
+            current_counts.append(sentence_tokens)
             current_tokens += sentence_tokens
-            text_position += len(sentence) + 1  # +1 for space
         
         # Add final chunk if not empty
         if current_chunk:
             chunk_text = ' '.join(current_chunk)
             
             # Add overlap from previous chunk if exists
-            overlap_text = self._get_overlap_text(chunks, chunk_text)
+            overlap_text, overlap_token_count = self._get_overlap(previous_text)
             if overlap_text:
                 chunk_text = overlap_text + ' ' + chunk_text
             
-            chunks.append({
+            yield {
                 'text': chunk_text,
                 'chunk_id': chunk_id,
-                'start_pos': text_position - len(' '.join(current_chunk)),
-                'end_pos': text_position,
-                'token_count': count_tokens(chunk_text),
+                'start_pos': sentence_offsets[chunk_start][0],
+                'end_pos': sentence_offsets[-1][1],
+                'token_count': current_tokens + overlap_token_count,
                 'sentence_count': len(current_chunk),
-                'has_overlap': bool(overlap_text)
-            })
-        
-        return chunks
+                'has_overlap': bool(overlap_text),
+                'first_sentence': current_chunk[0],
+                'last_sentence': current_chunk[-1]
+            }
     
     def summarize_chunks(self, chunks: List[Dict[str, Any]]) -> str:
         """
@@ -179,10 +253,15 @@ class DocumentProcessor:
         summary_parts = []
         
         for chunk in chunks[:5]:  # Limit to first 5 chunks for summary
-            chunk_text = chunk['text']
+            # Extract first and last sentences as key information. Chunks from
+            # chunk_document carry them; others are split here.
+            if 'first_sentence' in chunk:
+                summary_parts.append(chunk['first_sentence'])
+                if chunk['last_sentence'] != chunk['first_sentence']:
+                    summary_parts.append(chunk['last_sentence'])
+                continue
             
-            # Extract first and last sentences as key information
-            sentences = self._split_into_sentences(chunk_text)
+            sentences = self._split_into_sentences(chunk['text'])
             
             if len(sentences) >= 2:
                 summary_parts.append(sentences[0])
@@ -225,7 +304,7 @@ class DocumentProcessor:
         
         # Merge data from all chunks
         merged_data = {}
-        all_field_confidences = {}
+        field_confidence_sums = {}
         total_tokens = 0
         
         # Track field occurrences for confidence weighting
@@ -241,19 +320,17 @@ class DocumentProcessor:
             
             # Aggregate confidence scores
             for field, confidence in chunk_confidence.get('fields', {}).items():
-                if field not in all_field_confidences:
-                    all_field_confidences[field] = []
-                all_field_confidences[field].append(confidence)
+                field_confidence_sums[field] = field_confidence_sums.get(field, 0.0) + confidence
             
             total_tokens += chunk_result.get('token_usage', 0)
         
-        # Calculate weighted confidence scores
-        final_confidences = {}
-        for field, confidences in all_field_confidences.items():
-            # Weight by frequency and average confidence
-            avg_confidence = sum(confidences) / len(confidences)
-            frequency_weight = len(confidences) / len(chunk_results)
-            final_confidences[field] = avg_confidence * frequency_weight
+        # Weight by frequency and average confidence: (sum / seen) * (seen / total)
+        # reduces to sum / total, so no per-field score lists are needed
+        total_chunks = len(chunk_results)
+        final_confidences = {
+            field: confidence_sum / total_chunks
+            for field, confidence_sum in field_confidence_sums.items()
+        }
         
         overall_confidence = sum(final_confidences.values()) / len(final_confidences) if final_confidences else 0.0
         
@@ -271,95 +348,117 @@ class DocumentProcessor:
     
     def _split_into_sentences(self, text: str) -> List[str]:
         """Split text into sentences using regex patterns."""
-        # Enhanced sentence splitting pattern
-        sentence_pattern = r'(?<=[.!?])\s+(?=[A-Z])|(?<=[.!?])\s*\n+\s*(?=[A-Z])'
+        # Clean up sentences, filtering out very short fragments
+        cleaned_sentences = [
+            sentence for sentence in map(str.strip, _SENTENCE_RE.split(text.strip()))
+            if len(sentence) > 10
+        ]
         
-        sentences = re.split(sentence_pattern, text.strip())
+        return cleaned_sentences if cleaned_sentences else [text]
+    
+    def _locate_sentences(self, text: str, sentences: List[str]) -> List[Tuple[int, int]]:
+        """
+        Find the (start, end) character offsets of each split sentence in text.
         
-        # Clean up sentences
-        cleaned_sentences = []
+        Sentences are stripped, in-order fragments of text, so one forward
+        str.find scan places them all, however much whitespace the split consumed.
+        """
+        offsets = []
+        position = 0
         for sentence in sentences:
-            sentence = sentence.strip()
-            if sentence and len(sentence) > 10:  # Filter out very short fragments
-                cleaned_sentences.append(sentence)
+            start = text.find(sentence, position)
+            if start < 0:
+                start = position
+            position = start + len(sentence)
+            offsets.append((start, position))
+        return offsets
+    
+    def _get_tail_sentences(self, text: str, count: int) -> List[str]:
+        """
+        Get the last `count` sentences of text, as _split_into_sentences returns them.
         
-        return cleaned_sentences if cleaned_sentences else [text]
+        Only a growing suffix of the text is split. A boundary match never reaches
+        back past the punctuation before it, so every piece after the first one in
+        the suffix is a whole sentence of the full text.
+        """
+        stripped = text.strip()
+        window = 1024
+        while window < len(stripped):
+            pieces = _SENTENCE_RE.split(stripped[-window:])[1:]
+            tail = [piece for piece in map(str.strip, pieces) if len(piece) > 10]
+            if len(tail) >= count:
+                return tail[-count:]
+            window *= 4
+        
+        return self._split_into_sentences(text)[-count:]
     
     def _split_oversized_sentence(self, sentence: str, max_tokens: int) -> List[str]:
         """Split an oversized sentence into smaller chunks."""
         # Try splitting by clauses first
-        clause_patterns = [r',\s+', r';\s+', r'\s+and\s+', r'\s+or\s+', r'\s+but\s+']
-        
-        for pattern in clause_patterns:
-            parts = re.split(pattern, sentence)
+        for clause_re in _CLAUSE_RES:
+            parts = clause_re.split(sentence)
             if len(parts) > 1:
-                chunks = []
-                current_chunk = ""
-                
-                for part in parts:
-                    test_chunk = current_chunk + part if current_chunk else part
-                    if count_tokens(test_chunk) <= max_tokens:
-                        current_chunk = test_chunk
-                    else:
-                        if current_chunk:
-                            chunks.append(current_chunk)
-                        current_chunk = part
-                
-                if current_chunk:
-                    chunks.append(current_chunk)
+                chunks = self._pack_parts(parts, count_tokens_batch(parts), max_tokens, '')
                 
                 if all(count_tokens(chunk) <= max_tokens for chunk in chunks):
                     return chunks
         
         # Fallback: split by words
         words = sentence.split()
-        chunks = []
-        current_chunk = []
+        return self._pack_parts(words, count_tokens_batch(words), max_tokens, ' ')
+    
+    def _pack_parts(self, parts: List[str], part_tokens: List[int], max_tokens: int,
+                    separator: str) -> List[str]:
+        """
+        Greedily pack consecutive parts into chunks of at most max_tokens.
         
-        for word in words:
-            test_chunk = current_chunk + [word]
-            if count_tokens(' '.join(test_chunk)) <= max_tokens:
-                current_chunk = test_chunk
-            else:
-                if current_chunk:
-                    chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
+        Chunk sizes are the sum of the parts' own token counts, so each part is
+        tokenized once rather than re-tokenizing every growing prefix. A part
+        that alone exceeds max_tokens becomes a chunk of its own.
+        """
+        chunks = []
+        start = None  # Index of the first part in the chunk being packed
+        chunk_tokens = 0
         
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
+        for index, part in enumerate(parts):
+            if not part:
+                continue
+            tokens = part_tokens[index]
+            if start is not None and chunk_tokens + tokens > max_tokens:
+                chunks.append(separator.join(parts[start:index]))
+                start = None
+            if start is None:
+                start = index
+                chunk_tokens = 0
+            chunk_tokens += tokens
+        
+        if start is not None:
+            chunks.append(separator.join(parts[start:]))
         
         return chunks
     
-    def _get_overlap_text(self, existing_chunks: List[Dict[str, Any]], current_chunk_text: str) -> str:
-        """Get overlap text from previous chunk."""
-        if not existing_chunks:
-            return ""
-        
-        last_chunk = existing_chunks[-1]
-        last_chunk_sentences = self._split_into_sentences(last_chunk['text'])
+    def _get_overlap(self, previous_text: Optional[str]) -> Tuple[str, int]:
+        """Get overlap text from previous chunk, with its token count."""
+        if previous_text is None:
+            return "", 0
         
         # Take last few sentences for overlap
-        overlap_sentences = last_chunk_sentences[-2:] if len(last_chunk_sentences) >= 2 else last_chunk_sentences
+        overlap_sentences = self._get_tail_sentences(previous_text, 2)
         overlap_text = ' '.join(overlap_sentences)
+        overlap_token_count = count_tokens(overlap_text)
         
         # Ensure overlap doesn't exceed token limit
-        if count_tokens(overlap_text) > self.overlap_tokens:
-            # Truncate to fit overlap token limit
+        if overlap_token_count > self.overlap_tokens:
+            # Truncate to the longest run of trailing words whose token counts
+            # fit the overlap limit
             words = overlap_text.split()
-            truncated = []
-            current_tokens = 0
-            
-            for word in reversed(words):
-                word_tokens = count_tokens(word)
-                if current_tokens + word_tokens <= self.overlap_tokens:
-                    truncated.insert(0, word)
-                    current_tokens += word_tokens
-                else:
-                    break
+            suffix_tokens = list(accumulate(reversed(count_tokens_batch(words))))
+            fitting = bisect_right(suffix_tokens, self.overlap_tokens)
             
-            overlap_text = ' '.join(truncated)
+            overlap_text = ' '.join(words[len(words) - fitting:])
+            overlap_token_count = suffix_tokens[fitting - 1] if fitting else 0
         
-        return overlap_text
+        return overlap_text, overlap_token_count
     
     def _get_overlap_sentences(self, current_chunk: List[str]) -> List[str]:
         """Get sentences for overlap in next chunk."""
@@ -372,18 +471,34 @@ class DocumentProcessor:
     
     def _merge_with_conflict_resolution(self, merged_data: dict, chunk_data: dict, 
                                       field_values: dict, field_occurrences: dict) -> dict:
-        """Merge chunk data with conflict resolution."""
-        try:
-            from utils import flatten_schema, get_nested_value, set_nested_value
-        except ImportError:
-            from .utils import flatten_schema, get_nested_value, set_nested_value
-        
-        # Flatten both dictionaries for easier processing
-        merged_flat = self._flatten_dict(merged_data)
-        chunk_flat = self._flatten_dict(chunk_data)
-        
-        # Process each field in chunk data
-        for field_path, value in chunk_flat.items():
+        """Merge chunk data into merged_data (in place) with conflict resolution."""
+        self._merge_tree(merged_data, chunk_data, '', field_values, field_occurrences)
+        return merged_data
+    
+    def _merge_tree(self, target: dict, source: dict, prefix: str,
+                    field_values: dict, field_occurrences: dict):
+        """
+        Merge one level of chunk data into target, recursing into nested objects.
+        
+        Leaf values are tracked and resolved under their dotted field path.
+        Nested objects are only created once they receive a non-null leaf, and
+        a chunk value replaces an existing value of the other shape (object
+        vs. leaf).
+        """
+        for key, value in source.items():
+            field_path = prefix + '.' + key if prefix else key
+            
+            if isinstance(value, dict):
+                existing_value = target.get(key)
+                if isinstance(existing_value, dict):
+                    self._merge_tree(existing_value, value, field_path, field_values, field_occurrences)
+                else:
+                    subtree = {}
+                    self._merge_tree(subtree, value, field_path, field_values, field_occurrences)
+                    if subtree:
+                        target[key] = subtree
+                continue
+            
             if value is None:
                 continue
             
@@ -396,35 +511,15 @@ class DocumentProcessor:
             field_values[field_path].append(value)
             
             # Conflict resolution strategy
-            if field_path not in merged_flat:
+            existing_value = target.get(key)
+            if existing_value is None or isinstance(existing_value, dict):
                 # New field, add it
-                merged_flat[field_path] = value
+                target[key] = value
             else:
-                existing_value = merged_flat[field_path]
-                
                 # Resolve conflicts based on data type and frequency
-                resolved_value = self._resolve_field_conflict(
+                target[key] = self._resolve_field_conflict(
                     existing_value, value, field_values[field_path]
                 )
-                merged_flat[field_path] = resolved_value
-        
-        # Reconstruct nested dictionary
-        result = {}
-        for field_path, value in merged_flat.items():
-            set_nested_value(result, field_path, value)
-        
-        return result
-    
-    def _flatten_dict(self, d: dict, parent_key: str = '', sep: str = '.') -> dict:
-        """Flatten nested dictionary."""
-        items = []
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.extend(self._flatten_dict(v, new_key, sep=sep).items())
-            else:
-                items.append((new_key, v))
-        return dict(items)
     
     def _resolve_field_conflict(self, existing_value: Any, new_value: Any, all_values: List[Any]) -> Any:
         """Resolve conflicts between field values from different chunks."""
@@ -432,35 +527,9 @@ class DocumentProcessor:
         if existing_value == new_value:
             return existing_value
         
-        # For strings, prefer longer/more detailed value
-        if isinstance(existing_value, str) and isinstance(new_value, str):
-            return existing_value if len(existing_value) >= len(new_value) else new_value
-        
-        # For numbers, use the most frequent value
-        if isinstance(existing_value, (int, float)) and isinstance(new_value, (int, float)):
-            # Count occurrences
-            value_counts = {}
-            for val in all_values:
-                value_counts[val] = value_counts.get(val, 0) + 1
-            
-            # Return most frequent value
-            return max(value_counts.items(), key=lambda x: x[1])[0]
-        
-        # For lists, merge and deduplicate
-        if isinstance(existing_value, list) and isinstance(new_value, list):
-            combined = existing_value + new_value
-            # Remove duplicates while preserving order
-            seen = set()
-            result = []
-            for item in combined:
-                if item not in seen:
-                    seen.add(item)
-                    result.append(item)
-            return result
-        
-        # For booleans, prefer True if any chunk has True
-        if isinstance(existing_value, bool) and isinstance(new_value, bool):
-            return existing_value or new_value
+        resolver = _CONFLICT_RESOLVERS.get((type(existing_value), type(new_value)))
+        if resolver is not None:
+            return resolver(existing_value, new_value, all_values)
         
         # Default: prefer non-null, more recent value
         if new_value is not None:
@@ -0,0 +1,72 @@
+"""Persistent, content-addressed cache of extraction API responses."""
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Optional
+try:
+    from utils import canonical_json
+except ImportError:
+    from .utils import canonical_json
+
+
+class ExtractionCache:
+    """
+    Stores API responses as JSON files named by the hash of their request.
+    
+    Keys cover everything sent to the model (model name and full messages),
+    so a changed prompt, schema or text is a miss rather than a stale hit.
+    Files are written atomically, so several processes can share a directory.
+    """
+    
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(model: str, messages: Any) -> str:
+        """Hash a request into a cache key."""
+        return hashlib.sha256(canonical_json([model, messages]).encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)['value']
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            # Unreadable or corrupt entry; drop it so it gets rewritten
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+    
+    def put(self, key: str, value: Any):
+        """Store a JSON-serializable value under key."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {'created_at': datetime.now(timezone.utc).isoformat(), 'value': value}
+        
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    
+    def delete(self, key: str):
+        """Remove the entry for key, if there is one."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+    
+    def _path(self, key: str) -> str:
+        # Shard by the first two hex digits to keep directories small
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
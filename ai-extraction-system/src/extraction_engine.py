@@ -1,38 +1,169 @@
 """Extraction Engine for AI-powered text-to-JSON conversion."""
+import asyncio
+import hashlib
+import importlib.util
 import json
 import os
-from typing import Dict, List, Any, Optional, Tuple
-from openai import OpenAI
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Callable, Coroutine, Dict, Iterator, List, Any, Optional, Tuple
+from openai import (
+    APIConnectionError, AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient,
+    OpenAI, RateLimitError
+)
+from jsonschema.exceptions import best_match
+try:
+    from openai import DefaultAioHttpClient
+except ImportError:
+    DefaultAioHttpClient = None
 try:
     from schema_analyzer import SchemaAnalyzer
-    from utils import count_tokens, validate_json_against_schema, merge_dicts_deep
+    from extraction_cache import ExtractionCache
+    from rate_limiter import RateLimiter
+    from utils import (
+        count_tokens, estimate_schema_tokens, validate_json_against_schema, merge_dicts_deep_into,
+        get_schema_validator, get_schema_json, get_schema_fingerprint, get_nested_value, indented_json, parse_json,
+        IdentityCache
+    )
 except ImportError:
     from .schema_analyzer import SchemaAnalyzer
-    from .utils import count_tokens, validate_json_against_schema, merge_dicts_deep
+    from .extraction_cache import ExtractionCache
+    from .rate_limiter import RateLimiter
+    from .utils import (
+        count_tokens, estimate_schema_tokens, validate_json_against_schema, merge_dicts_deep_into,
+        get_schema_validator, get_schema_json, get_schema_fingerprint, get_nested_value, indented_json, parse_json,
+        IdentityCache
+    )
+
+# Static start of every system prompt; the canonical schema JSON follows it
+_SYSTEM_PROMPT_HEADER = "\n".join([
+    "You are an expert data extraction system. Extract structured data from text according to the provided JSON schema. Return only valid JSON that matches the schema exactly.",
+    "",
+    "INSTRUCTIONS:",
+    "1. Extract data that matches the schema exactly",
+    "2. Use null for missing required fields",
+    "3. Ensure all enum values match exactly",
+    "4. Maintain proper data types (string, number, boolean, array, object)",
+    "5. Return only valid JSON that conforms to the schema",
+    "",
+    "JSON SCHEMA:",
+    ""
+])
+
+# Per-request user prompt; note and context are preformatted blocks, empty
+# when absent
+_USER_PROMPT_TEMPLATE = "{note}{context}TEXT TO EXTRACT FROM:\n{text}\n\nEXTRACTED DATA:"
+_NOTE_TEMPLATE = "{}\n\n"
+_DATA_CONTEXT_TEMPLATE = "CONTEXT FROM PREVIOUS EXTRACTIONS:\n{}\n\n"
+_TEXT_CONTEXT_TEMPLATE = "CONTEXT:\n{}\n\n"
+
+# Stands in for the header in cache keys, with the schema's fingerprint
+# standing in for the rest of the system prompt
+_SYSTEM_PROMPT_HEADER_DIGEST = hashlib.sha256(_SYSTEM_PROMPT_HEADER.encode('utf-8')).hexdigest()
+
+# httpx only negotiates HTTP/2 when the optional h2 package is installed
+HTTP2_ENABLED = importlib.util.find_spec('h2') is not None
+
+# The aiohttp transport (openai[aiohttp]) holds up better than httpx's async
+# pool under many concurrent requests; it is used when available. Newer openai
+# versions always export DefaultAioHttpClient, as a stub that raises unless
+# httpx_aiohttp is installed too.
+AIOHTTP_ENABLED = (
+    DefaultAioHttpClient is not None
+    and importlib.util.find_spec('aiohttp') is not None
+    and importlib.util.find_spec('httpx_aiohttp') is not None
+)
+
+
+@lru_cache(maxsize=1024)
+def _compile_pattern(pattern: str) -> re.Pattern:
+    """Compile a schema pattern once for all the fields and results that use it."""
+    return re.compile(pattern)
+
+
+def _correctable_violation(data: Any, schema: dict) -> Optional[str]:
+    """
+    Describe the first schema violation worth asking the model to correct.
+    
+    A null where the schema wants another type is left alone: the prompt
+    tells the model to use null for missing fields, and asking again would
+    only push it to make a value up.
+    """
+    is_valid, validation_error = validate_json_against_schema(data, schema)
+    if is_valid:
+        return None
+    error = best_match(
+        error for error in get_schema_validator(schema).iter_errors(data)
+        if not (error.validator == 'type' and error.instance is None)
+    )
+    return None if error is None else str(error)
+
+
+# System prompts are built once per schema object, so fanning one schema out
+# over many chunks or levels reuses the same string
+_system_prompts = IdentityCache(lambda schema: _SYSTEM_PROMPT_HEADER + get_schema_json(schema))
 
 
 class ExtractionEngine:
     """Main extraction engine using OpenAI API."""
     
-    def __init__(self, model: str = "gpt-4.1", api_key: str = None):
+    def __init__(self, model: str = "gpt-4.1", api_key: str = None,
+                 cache: ExtractionCache = None, rate_limiter: RateLimiter = None):
         self.model = model
-        self.client = OpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY'))
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.client = OpenAI(
+            api_key=self.api_key, http_client=DefaultHttpxClient(http2=HTTP2_ENABLED)
+        )
         self.schema_analyzer = SchemaAnalyzer()
         self.max_tokens_per_request = int(os.getenv('MAX_TOKENS_PER_REQUEST', 1000000))
+        self.max_concurrent_requests = int(os.getenv('MAX_CONCURRENT_REQUESTS', 8))
+        # Schema tokens one packed chunk request may carry; the response grows
+        # with the schema, and smaller packs keep a wave's requests concurrent
+        self.max_pack_schema_tokens = int(os.getenv('MAX_PACK_SCHEMA_TOKENS', 4000))
+        # Follow-up requests asking the model to fix invalid or off-schema JSON
+        self.correction_retries = int(os.getenv('CORRECTION_RETRIES', 1))
+        # Chunked extractions estimated above this many input tokens go through
+        # the Batch API; 0 keeps them online
+        self.batch_threshold_tokens = int(os.getenv('BATCH_THRESHOLD_TOKENS', 0))
+        # Chunk fan-outs share one background event loop and async client, so
+        # pooled connections stay alive between requests instead of being
+        # re-established (TCP + TLS) for every document
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._async_client = None
+        # Persistent cache of parsed API responses, off unless configured
+        if cache is None and os.getenv('EXTRACTION_CACHE_DIR'):
+            cache = ExtractionCache(os.getenv('EXTRACTION_CACHE_DIR'))
+        self.cache = cache
+        # One limiter paces every online request the engine makes, sync or
+        # async, so concurrent extractions stay under the account's quota
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(
+                float(os.getenv('MAX_REQUESTS_PER_MINUTE', 0)),
+                float(os.getenv('MAX_TOKENS_PER_MINUTE', 0))
+            )
+        self.rate_limiter = rate_limiter
     
-    def extract(self, text: str, schema: dict) -> dict:
+    def extract(self, text: str, schema: dict, analysis: dict = None, batch: bool = False) -> dict:
         """
         Main extraction method that automatically chooses the best strategy.
         
         Args:
             text: Input text to extract from
             schema: JSON schema defining the expected output structure
+            analysis: Precomputed SchemaAnalyzer.analyze_complexity result
+            batch: Send chunked-schema requests through the OpenAI Batch API
             
         Returns:
             dict: Extracted data with confidence scores
         """
         # Analyze schema complexity
-        analysis = self.schema_analyzer.analyze_complexity(schema)
+        if analysis is None:
+            analysis = self._quick_analysis(schema)
         strategy = analysis['strategy']
         
         if strategy == 'single_pass':
@@ -41,8 +172,17 @@ class ExtractionEngine:
             return self.extract_hierarchical(text, schema)
         else:  # multi_pass_chunked
             schema_chunks = self.schema_analyzer.chunk_schema(schema)
+            if not batch and self.batch_threshold_tokens:
+                # Every schema chunk request carries the whole text
+                batch = len(schema_chunks) * count_tokens(text) > self.batch_threshold_tokens
+            if batch:
+                return self.extract_complex_batch(text, schema_chunks)
             return self.extract_complex(text, schema_chunks)
     
+    def _quick_analysis(self, schema: dict) -> dict:
+        """Stand in for an analyze_complexity result; only its strategy is used here."""
+        return {'strategy': self.schema_analyzer.quick_strategy(schema)}
+    
     def extract_simple(self, text: str, schema: dict) -> dict:
         """
         Single-pass extraction for simple schemas.
@@ -54,35 +194,69 @@ class ExtractionEngine:
         Returns:
             dict: Extraction result with confidence scores
         """
-        prompt = self._build_extraction_prompt(text, schema)
-        
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert data extraction system. Extract structured data from text according to the provided JSON schema. Return only valid JSON that matches the schema exactly."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            confidence = self.calculate_confidence(result, schema, text)
+            result, token_usage = self._complete_json(self._build_extraction_messages(text, schema), schema)
+            return self._build_simple_result(result, token_usage, schema, text)
             
+        except (RateLimitError, APIConnectionError):
+            # Transient API failures are raised so callers can retry the request
+            raise
+        except Exception as e:
             return {
-                'data': result,
-                'confidence': confidence,
-                'strategy': 'single_pass',
-                'token_usage': response.usage.total_tokens if response.usage else 0
+                'data': {},
+                'confidence': {'overall': 0.0, 'fields': {}},
+                'error': str(e),
+                'strategy': 'single_pass'
             }
+    
+    async def extract_async(self, text: str, schema: dict, client: AsyncOpenAI = None,
+                            analysis: dict = None) -> dict:
+        """
+        Async counterpart of extract() for concurrent fan-out.
+        
+        Args:
+            text: Input text to extract from
+            schema: JSON schema defining the expected output structure
+            client: Shared AsyncOpenAI client (a temporary one is created if omitted)
+            analysis: Precomputed SchemaAnalyzer.analyze_complexity result
+            
+        Returns:
+            dict: Extracted data with confidence scores
+        """
+        if analysis is None:
+            analysis = self._quick_analysis(schema)
+        
+        if analysis['strategy'] != 'single_pass':
+            # Multi-pass strategies are still synchronous; run them off the loop
+            return await asyncio.to_thread(self.extract, text, schema, analysis)
+        
+        if client is None:
+            async with AsyncOpenAI(api_key=self.api_key) as temp_client:
+                return await self.extract_simple_async(text, schema, temp_client)
+        
+        return await self.extract_simple_async(text, schema, client)
+    
+    async def extract_simple_async(self, text: str, schema: dict, client: AsyncOpenAI) -> dict:
+        """
+        Async single-pass extraction.
+        
+        Args:
+            text: Input text
+            schema: JSON schema
+            client: AsyncOpenAI client to issue the request with
             
+        Returns:
+            dict: Extraction result with confidence scores
+        """
+        try:
+            result, token_usage = await self._complete_json_async(
+                client, self._build_extraction_messages(text, schema), schema
+            )
+            return self._build_simple_result(result, token_usage, schema, text)
+            
+        except (RateLimitError, APIConnectionError):
+            # Transient API failures are raised so callers can retry the request
+            raise
         except Exception as e:
             return {
                 'data': {},
@@ -91,6 +265,473 @@ class ExtractionEngine:
                 'strategy': 'single_pass'
             }
     
+    def extract_chunks(self, texts: List[str], schema: dict, max_concurrency: int = None,
+                       analysis: dict = None) -> List[dict]:
+        """
+        Extract from several text chunks concurrently.
+        
+        Args:
+            texts: Chunk texts to extract from
+            schema: JSON schema applied to every chunk
+            max_concurrency: Cap on in-flight API calls (defaults to MAX_CONCURRENT_REQUESTS)
+            analysis: Precomputed SchemaAnalyzer.analyze_complexity result
+            
+        Returns:
+            List of extraction results in the same order as texts
+        """
+        if max_concurrency is None:
+            max_concurrency = self.max_concurrent_requests
+        if analysis is None:
+            analysis = self._quick_analysis(schema)
+        
+        return self._run_coroutine(
+            self._extract_chunks_async(texts, schema, max_concurrency, analysis)
+        ).result()
+    
+    def extract_batch(self, texts: List[str], schema: dict, poll_interval: float = 30.0,
+                      timeout: float = None, analysis: dict = None) -> List[dict]:
+        """
+        Extract from several text chunks through the OpenAI Batch API.
+        
+        Batch requests cost half as much as regular calls but can take up to
+        24 hours, so this is meant for offline or non-interactive workloads.
+        
+        Args:
+            texts: Chunk texts to extract from
+            schema: JSON schema applied to every chunk
+            poll_interval: Seconds between batch status checks
+            timeout: Give up (and cancel the batch) after this many seconds
+            analysis: Precomputed SchemaAnalyzer.analyze_complexity result
+            
+        Returns:
+            List of extraction results in the same order as texts
+        """
+        if analysis is None:
+            analysis = self._quick_analysis(schema)
+        if analysis['strategy'] != 'single_pass':
+            # Multi-pass strategies feed each response into the next request,
+            # so they can't be queued as independent batch entries
+            return self.extract_chunks(texts, schema, analysis=analysis)
+        
+        outcomes = self._run_batch(
+            [(schema, self._build_extraction_messages(text, schema)) for text in texts],
+            poll_interval, timeout
+        )
+        
+        results = []
+        for text, outcome in zip(texts, outcomes):
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                results.append(self._build_simple_result(outcome[0], outcome[1], schema, text))
+            except Exception as e:
+                results.append({
+                    'data': {},
+                    'confidence': {'overall': 0.0, 'fields': {}},
+                    'error': str(e),
+                    'strategy': 'single_pass'
+                })
+        
+        return results
+    
+    def extract_complex_batch(self, text: str, schema_chunks: List[dict],
+                              poll_interval: float = 30.0, timeout: float = None) -> dict:
+        """
+        extract_complex with its requests sent through the OpenAI Batch API.
+        
+        Each wave of independent schema chunks is one batch, so a schema with
+        dependent chunks takes several batches in sequence.
+        
+        Args:
+            text: Input text
+            schema_chunks: List of schema chunks from SchemaAnalyzer
+            poll_interval: Seconds between batch status checks
+            timeout: Give up (and cancel the batch) after this many seconds per wave
+            
+        Returns:
+            dict: Merged extraction results with confidence scores
+        """
+        def request_wave(packs: List[List[dict]], previous_results: dict) -> List[Any]:
+            outcomes = self._run_batch(
+                [self._build_pack_messages(text, pack, previous_results) for pack in packs],
+                poll_interval, timeout
+            )
+            return self._split_pack_outcomes(packs, outcomes)
+        
+        return self._extract_schema_chunks(text, schema_chunks, request_wave)
+    
+    def _run_batch(self, requests: List[Tuple[dict, List[dict]]], poll_interval: float,
+                   timeout: float = None) -> List[Any]:
+        """
+        Run chat requests (schema and messages pairs) through the OpenAI Batch API.
+        
+        Returns (data, token_usage) pairs in request order, with exceptions in
+        place of failed requests. Cached requests aren't submitted.
+        
+        Raises:
+            TimeoutError: The batch didn't finish within timeout seconds (it is cancelled)
+        """
+        outcomes = [None] * len(requests)
+        cache_keys = [None] * len(requests)
+        request_lines = []
+        for i, (schema, messages) in enumerate(requests):
+            cache_keys[i], cached = self._cache_get(messages, schema)
+            if cached is not None:
+                outcomes[i] = (cached, 0)
+                continue
+            request_lines.append(json.dumps({
+                'custom_id': f'request-{i}',
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {
+                    'model': self.model,
+                    'messages': messages,
+                    'response_format': {'type': 'json_object'},
+                    'temperature': 0.1
+                }
+            }))
+        
+        if not request_lines:
+            return outcomes
+        
+        batch_file = self.client.files.create(
+            file=('extraction_batch.jsonl', '\n'.join(request_lines).encode('utf-8')),
+            purpose='batch'
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            if deadline is not None and time.monotonic() >= deadline:
+                self.client.batches.cancel(batch.id)
+                raise TimeoutError(f"Batch {batch.id} did not finish within {timeout} seconds")
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        
+        if batch.output_file_id:
+            output = self.client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                entry = parse_json(line)
+                index = int(entry['custom_id'].split('-', 1)[1])
+                response = entry.get('response') or {}
+                
+                if entry.get('error') or response.get('status_code') != 200:
+                    outcomes[index] = RuntimeError(str(entry.get('error') or response.get('body')))
+                    continue
+                
+                body = response['body']
+                try:
+                    data = parse_json(body['choices'][0]['message']['content'])
+                except Exception as e:
+                    outcomes[index] = e
+                    continue
+                self._cache_put(cache_keys[index], data, requests[index][0])
+                outcomes[index] = (data, (body.get('usage') or {}).get('total_tokens', 0))
+        
+        return [
+            outcome if outcome is not None
+            else RuntimeError(f"Batch {batch.id} {batch.status} without a result")
+            for outcome in outcomes
+        ]
+    
+    def iter_extract_chunks(self, texts: List[str], schema: dict, max_concurrency: int = None,
+                            analysis: dict = None) -> Iterator[Tuple[int, dict]]:
+        """
+        Extract from several text chunks concurrently, yielding results as they finish.
+        
+        Args:
+            texts: Chunk texts to extract from
+            schema: JSON schema applied to every chunk
+            max_concurrency: Cap on in-flight API calls (defaults to MAX_CONCURRENT_REQUESTS)
+            analysis: Precomputed SchemaAnalyzer.analyze_complexity result
+            
+        Yields:
+            (index, result) pairs in completion order
+        """
+        if max_concurrency is None:
+            max_concurrency = self.max_concurrent_requests
+        if analysis is None:
+            analysis = self._quick_analysis(schema)
+        
+        completed = queue.Queue()
+        
+        # The event loop runs on its own thread so results can be yielded
+        # to the caller while other chunks are still in flight
+        future = self._run_coroutine(self._extract_chunks_async(
+            texts, schema, max_concurrency, analysis,
+            on_result=lambda index, result: completed.put((index, result))
+        ))
+        future.add_done_callback(lambda _: completed.put(None))
+        
+        while True:
+            item = completed.get()
+            if item is None:
+                break
+            yield item
+        
+        # Re-raises the first failure, if any
+        future.result()
+    
+    async def _extract_chunks_async(self, texts: List[str], schema: dict, max_concurrency: int,
+                                    analysis: dict,
+                                    on_result: Callable[[int, dict], None] = None) -> List[dict]:
+        """Fan chunk extractions out over the engine's shared async client."""
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        client = self._get_async_client()
+        
+        async def extract_one(index: int, text: str) -> dict:
+            async with semaphore:
+                result = await self.extract_async(text, schema, client, analysis)
+            if on_result is not None:
+                on_result(index, result)
+            return result
+        
+        return list(await asyncio.gather(*(extract_one(i, text) for i, text in enumerate(texts))))
+    
+    async def _request_schema_chunks_async(self, text: str, packs: List[List[dict]],
+                                           previous_results: dict) -> List[Any]:
+        """
+        Send one wave of schema chunk requests concurrently, one per pack.
+        
+        Returns (data, token_usage) pairs for every chunk, in pack order, with
+        exceptions in place of failed requests.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrent_requests))
+        client = self._get_async_client()
+        
+        async def request_pack(pack: List[dict]) -> Tuple[Any, int]:
+            pack_schema, messages = self._build_pack_messages(text, pack, previous_results)
+            async with semaphore:
+                return await self._complete_json_async(client, messages, pack_schema)
+        
+        pack_outcomes = await asyncio.gather(*(request_pack(pack) for pack in packs),
+                                             return_exceptions=True)
+        return self._split_pack_outcomes(packs, pack_outcomes)
+    
+    def _build_pack_messages(self, text: str, pack: List[dict],
+                             previous_results: dict) -> Tuple[dict, List[dict]]:
+        """
+        Build the request for a pack of schema chunks.
+        
+        Returns the schema the response should match (chunk_<id> keys for
+        several chunks) and the messages.
+        """
+        if len(pack) == 1:
+            chunk_info = pack[0]
+            return chunk_info['schema'], self._build_extraction_messages(
+                text, chunk_info['schema'],
+                context=self._build_chunk_context(previous_results, chunk_info['dependencies']),
+                note=f"You are extracting chunk {chunk_info['chunk_id'] + 1} of {chunk_info['total_chunks']}. Use provided context from previous extractions."
+            )
+        
+        packed_schema = {
+            'type': 'object',
+            'properties': {
+                f"chunk_{chunk_info['chunk_id']}": chunk_info['schema'] for chunk_info in pack
+            }
+        }
+        dependencies = list(dict.fromkeys(
+            dep for chunk_info in pack for dep in chunk_info['dependencies']
+        ))
+        chunk_numbers = ', '.join(str(chunk_info['chunk_id'] + 1) for chunk_info in pack)
+        
+        return packed_schema, self._build_extraction_messages(
+            text, packed_schema, context=self._build_chunk_context(previous_results, dependencies),
+            note=f"You are extracting chunks {chunk_numbers} of {pack[0]['total_chunks']} at once. Put each chunk's data under its own chunk_<id> key. Use provided context from previous extractions."
+        )
+    
+    def _split_pack_outcomes(self, packs: List[List[dict]], pack_outcomes: List[Any]) -> List[Any]:
+        """
+        Split per-pack (data, token_usage) outcomes into per-chunk ones.
+        
+        A failed pack fails each of its chunks. The whole request's usage is
+        attributed to the pack's first chunk.
+        """
+        outcomes = []
+        
+        for pack, pack_outcome in zip(packs, pack_outcomes):
+            if isinstance(pack_outcome, BaseException):
+                outcomes.extend([pack_outcome] * len(pack))
+                continue
+            
+            data, token_usage = pack_outcome
+            if len(pack) == 1:
+                outcomes.append(pack_outcome)
+            elif not isinstance(data, dict):
+                error = ValueError(f"Expected a JSON object for packed chunks, got {type(data).__name__}")
+                outcomes.extend([error] * len(pack))
+            else:
+                outcomes.extend(
+                    (data.get(f"chunk_{chunk_info['chunk_id']}") or {}, token_usage if i == 0 else 0)
+                    for i, chunk_info in enumerate(pack)
+                )
+        
+        return outcomes
+    
+    def _complete_json(self, messages: List[dict], schema: dict) -> Tuple[Any, int]:
+        """
+        Request a JSON completion for schema and parse it.
+        
+        A response that isn't valid JSON or doesn't match the schema is sent
+        back with the error for correction, up to correction_retries times.
+        Returns the parsed data and the tokens used across attempts. With a
+        cache configured, repeated requests are served from it without using
+        any tokens.
+        """
+        cache_key, cached = self._cache_get(messages, schema)
+        if cached is not None:
+            return cached, 0
+        
+        token_usage = 0
+        for attempt in range(self.correction_retries + 1):
+            self.rate_limiter.acquire(self._estimate_request_tokens(messages))
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            token_usage += response.usage.total_tokens if response.usage else 0
+            content = response.choices[0].message.content
+            
+            data, problem = self._review_completion(content, schema, attempt == self.correction_retries)
+            if problem is None:
+                break
+            messages = self._correction_messages(messages, content, problem)
+        
+        self._cache_put(cache_key, data, schema)
+        return data, token_usage
+    
+    async def _complete_json_async(self, client: AsyncOpenAI, messages: List[dict],
+                                   schema: dict) -> Tuple[Any, int]:
+        """Async counterpart of _complete_json."""
+        cache_key, cached = self._cache_get(messages, schema)
+        if cached is not None:
+            return cached, 0
+        
+        token_usage = 0
+        for attempt in range(self.correction_retries + 1):
+            await self.rate_limiter.acquire_async(self._estimate_request_tokens(messages))
+            response = await client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            token_usage += response.usage.total_tokens if response.usage else 0
+            content = response.choices[0].message.content
+            
+            data, problem = self._review_completion(content, schema, attempt == self.correction_retries)
+            if problem is None:
+                break
+            messages = self._correction_messages(messages, content, problem)
+        
+        self._cache_put(cache_key, data, schema)
+        return data, token_usage
+    
+    def _review_completion(self, content: str, schema: dict, final: bool) -> Tuple[Any, Optional[str]]:
+        """
+        Parse a completion and check it against the schema.
+        
+        Returns the data and a description of what to correct, or None when
+        it needs no correction. On the final attempt the data is returned as
+        is, and unparseable content raises.
+        """
+        try:
+            data = parse_json(content)
+        except (TypeError, ValueError) as e:
+            if final:
+                raise
+            return None, f"Your response was not valid JSON: {e}"
+        
+        if not final:
+            violation = _correctable_violation(data, schema)
+            if violation is not None:
+                return data, f"Your response did not match the schema: {violation}"
+        
+        return data, None
+    
+    def _correction_messages(self, messages: List[dict], content: str, problem: str) -> List[dict]:
+        """Extend a conversation with the rejected response and a request to fix it."""
+        return messages + [
+            {"role": "assistant", "content": content or ""},
+            {"role": "user", "content": f"{problem}\n\nFix this and return only valid JSON that conforms to the schema."}
+        ]
+    
+    def _estimate_request_tokens(self, messages: List[dict]) -> int:
+        """Estimate a request's prompt tokens for the rate limiter, if it needs them."""
+        if not self.rate_limiter.limits_tokens:
+            return 0
+        return sum(count_tokens(message['content'] or '') for message in messages)
+    
+    def _cache_get(self, messages: List[dict], schema: dict) -> Tuple[Optional[str], Any]:
+        """
+        Look a request for schema up in the cache, returning its key and any cached data.
+        
+        The system message is built from the schema, so it is keyed by the
+        schema's memoized fingerprint rather than re-serialized and hashed for
+        every request. Hits are revalidated against schema.
+        """
+        if self.cache is None:
+            return None, None
+        key = ExtractionCache.make_key(self.model, [
+            _SYSTEM_PROMPT_HEADER_DIGEST, get_schema_fingerprint(schema), messages[1:]
+        ])
+        cached = self.cache.get(key)
+        if cached is not None and _correctable_violation(cached, schema) is not None:
+            # Off-schema entries are evicted so the request is made again
+            try:
+                self.cache.delete(key)
+            except OSError:
+                pass
+            return key, None
+        return key, cached
+    
+    def _cache_put(self, cache_key: Optional[str], data: Any, schema: dict):
+        """
+        Cache parsed response data if it matches schema.
+        
+        Responses still off-schema after correction are returned but not kept,
+        so a later request asks again. A failed write only costs a future hit.
+        """
+        if cache_key is None or _correctable_violation(data, schema) is not None:
+            return
+        try:
+            self.cache.put(cache_key, data)
+        except OSError as e:
+            print(f"Could not write extraction cache entry: {e}")
+    
+    def _get_async_client(self) -> AsyncOpenAI:
+        """Get the engine's shared async client, creating it on first use."""
+        if self._async_client is None:
+            # Only ever touched on the engine's event loop thread
+            http_client = None
+            if AIOHTTP_ENABLED:
+                try:
+                    http_client = DefaultAioHttpClient()
+                except (ImportError, RuntimeError):
+                    pass
+            if http_client is None:
+                http_client = DefaultAsyncHttpxClient(http2=HTTP2_ENABLED)
+            self._async_client = AsyncOpenAI(api_key=self.api_key, http_client=http_client)
+        return self._async_client
+    
+    def _run_coroutine(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the engine's background event loop."""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name='extraction-engine-loop', daemon=True
+                ).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
     def extract_hierarchical(self, text: str, schema: dict) -> dict:
         """
         Multi-pass hierarchical extraction for complex nested schemas.
@@ -114,32 +755,18 @@ class ExtractionEngine:
         
         for level, fields in levels.items():
             level_schema = self._build_level_schema(schema, fields)
-            level_prompt = self._build_extraction_prompt(text, level_schema, result)
             
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"You are extracting data at hierarchy level {level}. Use any previously extracted data as context."
-                        },
-                        {
-                            "role": "user",
-                            "content": level_prompt
-                        }
-                    ],
-                    response_format={"type": "json_object"},
-                    temperature=0.1
-                )
-                
-                level_result = json.loads(response.choices[0].message.content)
-                result = merge_dicts_deep(result, level_result)
+                level_result, token_usage = self._complete_json(self._build_extraction_messages(
+                    text, level_schema, context=result,
+                    note=f"You are extracting data at hierarchy level {level}. Use any previously extracted data as context."
+                ), level_schema)
+                merge_dicts_deep_into(result, level_result)
                 
                 level_confidence = self.calculate_confidence(level_result, level_schema, text)
                 confidence_scores.update(level_confidence['fields'])
                 
-                total_tokens += response.usage.total_tokens if response.usage else 0
+                total_tokens += token_usage
                 
             except Exception as e:
                 print(f"Error in hierarchical extraction level {level}: {e}")
@@ -168,6 +795,21 @@ class ExtractionEngine:
         Returns:
             dict: Merged extraction results with confidence scores
         """
+        def request_wave(packs: List[List[dict]], previous_results: dict) -> List[Any]:
+            return self._run_coroutine(
+                self._request_schema_chunks_async(text, packs, previous_results)
+            ).result()
+        
+        return self._extract_schema_chunks(text, schema_chunks, request_wave)
+    
+    def _extract_schema_chunks(self, text: str, schema_chunks: List[dict],
+                               request_wave: Callable[[List[List[dict]], dict], List[Any]]) -> dict:
+        """
+        Extract schema chunks wave by wave and merge the results.
+        
+        request_wave(packs, previous_results) sends one wave's requests and
+        returns a (data, token_usage) pair or exception per chunk, in order.
+        """
         results = []
         total_tokens = 0
         
@@ -176,67 +818,57 @@ class ExtractionEngine:
                              key=lambda x: {'high': 0, 'medium': 1, 'low': 2}[x['priority']])
         
         previous_results = {}
+        text_tokens = None
         
-        for chunk_info in sorted_chunks:
-            chunk_schema = chunk_info['schema']
-            chunk_id = chunk_info['chunk_id']
-            
-            # Build context from previous results
-            context_prompt = self._build_chunk_context(previous_results, chunk_info['dependencies'])
-            prompt = self._build_extraction_prompt(text, chunk_schema, context=context_prompt)
+        for wave in self._plan_chunk_waves(sorted_chunks):
+            # Chunks in a wave don't depend on each other's fields, so their
+            # requests go out together, packed so the text is sent once per
+            # request rather than once per chunk; context comes from earlier waves
+            if len(wave) > 1 and text_tokens is None:
+                text_tokens = count_tokens(text)
+            packs = self._plan_chunk_packs(wave, text_tokens or 0)
+            outcomes = request_wave(packs, previous_results)
             
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"You are extracting chunk {chunk_id + 1} of {chunk_info['total_chunks']}. Use provided context from previous extractions."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    response_format={"type": "json_object"},
-                    temperature=0.1
-                )
+            for chunk_info, outcome in zip(wave, outcomes):
+                chunk_schema = chunk_info['schema']
+                chunk_id = chunk_info['chunk_id']
                 
-                chunk_result = json.loads(response.choices[0].message.content)
-                confidence = self.calculate_confidence(chunk_result, chunk_schema, text)
-                
-                results.append({
-                    'data': chunk_result,
-                    'confidence': confidence,
-                    'chunk_id': chunk_id,
-                    'priority': chunk_info['priority']
-                })
-                
-                # Update previous results for context
-                previous_results = merge_dicts_deep(previous_results, chunk_result)
-                total_tokens += response.usage.total_tokens if response.usage else 0
-                
-            except Exception as e:
-                print(f"Error in chunk {chunk_id}: {e}")
-                results.append({
-                    'data': {},
-                    'confidence': {'overall': 0.0, 'fields': {}},
-                    'chunk_id': chunk_id,
-                    'error': str(e)
-                })
+                try:
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    
+                    chunk_result, token_usage = outcome
+                    confidence = self.calculate_confidence(chunk_result, chunk_schema, text)
+                    
+                    results.append({
+                        'data': chunk_result,
+                        'confidence': confidence,
+                        'chunk_id': chunk_id,
+                        'priority': chunk_info['priority']
+                    })
+                    
+                    # Update previous results for context; they double as the
+                    # merged data, so each result is merged exactly once
+                    merge_dicts_deep_into(previous_results, chunk_result)
+                    total_tokens += token_usage
+                    
+                except Exception as e:
+                    print(f"Error in chunk {chunk_id}: {e}")
+                    results.append({
+                        'data': {},
+                        'confidence': {'overall': 0.0, 'fields': {}},
+                        'chunk_id': chunk_id,
+                        'error': str(e)
+                    })
         
-        # Merge all results
-        merged_data = {}
         all_field_confidences = {}
-        
         for result in results:
-            merged_data = merge_dicts_deep(merged_data, result['data'])
             all_field_confidences.update(result['confidence']['fields'])
         
         overall_confidence = sum(all_field_confidences.values()) / len(all_field_confidences) if all_field_confidences else 0.0
         
         return {
-            'data': merged_data,
+            'data': previous_results,
             'confidence': {
                 'overall': overall_confidence,
                 'fields': all_field_confidences
@@ -265,17 +897,7 @@ class ExtractionEngine:
         base_confidence = 0.8 if is_valid else 0.3
         
         # Calculate field-level confidence
-        try:
-            from utils import flatten_schema
-        except ImportError:
-            from .utils import flatten_schema
-        flattened_schema = flatten_schema(schema)
-        
-        for field_path, field_schema in flattened_schema.items():
-            field_confidence = self._calculate_field_confidence(
-                result, field_path, field_schema, original_text
-            )
-            field_confidences[field_path] = field_confidence
+        self._collect_field_confidences(result, schema, "", field_confidences)
         
         overall_confidence = sum(field_confidences.values()) / len(field_confidences) if field_confidences else base_confidence
         
@@ -286,54 +908,80 @@ class ExtractionEngine:
             'validation_error': validation_error if not is_valid else None
         }
     
-    def _build_extraction_prompt(self, text: str, schema: dict, context: Any = None) -> str:
-        """Build extraction prompt for OpenAI API."""
-        prompt_parts = [
-            "Extract structured data from the following text according to the JSON schema provided.",
-            "",
-            "TEXT TO EXTRACT FROM:",
-            text,  # GPT-4.1 can handle up to 1M tokens, no need to limit
-            "",
-            "JSON SCHEMA:",
-            json.dumps(schema, indent=2),
-            ""
+    def _build_extraction_messages(self, text: str, schema: dict, context: Any = None,
+                                   note: str = None) -> List[dict]:
+        """
+        Build chat messages for an extraction request.
+        
+        The instructions and schema go first in the system message and are
+        serialized canonically, so every request for the same schema shares a
+        byte-identical prefix that the provider's prompt cache can reuse. Only
+        the per-request parts (note, context, text) vary, in the user message.
+        """
+        return [
+            {
+                "role": "system",
+                "content": self._build_system_prompt(schema)
+            },
+            {
+                "role": "user",
+                "content": self._build_extraction_prompt(text, context, note)
+            }
         ]
+    
+    def _build_system_prompt(self, schema: dict) -> str:
+        """Build the static system prompt for a schema."""
+        return _system_prompts(schema)
+    
+    def _build_simple_result(self, result: dict, token_usage: int, schema: dict, text: str) -> dict:
+        """Score a single-pass completion's parsed data into an extraction result."""
+        confidence = self.calculate_confidence(result, schema, text)
         
+        return {
+            'data': result,
+            'confidence': confidence,
+            'strategy': 'single_pass',
+            'token_usage': token_usage
+        }
+    
+    def _build_extraction_prompt(self, text: str, context: Any = None, note: str = None) -> str:
+        """Build the per-request user prompt for OpenAI API."""
+        context_block = ""
         if context:
             if isinstance(context, dict):
-                prompt_parts.extend([
-                    "CONTEXT FROM PREVIOUS EXTRACTIONS:",
-                    json.dumps(context, indent=2),
-                    ""
-                ])
+                context_block = _DATA_CONTEXT_TEMPLATE.format(indented_json(context))
             elif isinstance(context, str):
-                prompt_parts.extend([
-                    "CONTEXT:",
-                    context,
-                    ""
-                ])
-        
-        prompt_parts.extend([
-            "INSTRUCTIONS:",
-            "1. Extract data that matches the schema exactly",
-            "2. Use null for missing required fields",
-            "3. Ensure all enum values match exactly",
-            "4. Maintain proper data types (string, number, boolean, array, object)",
-            "5. Return only valid JSON that conforms to the schema",
-            "",
-            "EXTRACTED DATA:"
-        ])
+                context_block = _TEXT_CONTEXT_TEMPLATE.format(context)
         
-        return "\n".join(prompt_parts)
+        # GPT-4.1 can handle up to 1M tokens, no need to limit the text
+        return _USER_PROMPT_TEMPLATE.format_map({
+            'note': _NOTE_TEMPLATE.format(note) if note else "",
+            'context': context_block,
+            'text': text
+        })
     
-    def _calculate_field_confidence(self, result: dict, field_path: str, field_schema: dict, original_text: str) -> float:
-        """Calculate confidence for a specific field."""
-        try:
-            from utils import get_nested_value
-        except ImportError:
-            from .utils import get_nested_value
+    def _collect_field_confidences(self, node: Any, schema: dict, prefix: str,
+                                   field_confidences: Dict[str, float]):
+        """
+        Score every leaf field of schema, walking the result alongside it.
+        
+        Fields are visited in flatten_schema order, and each value is read
+        from its parent rather than looked up from the root of the result.
+        """
+        if 'properties' not in schema:
+            return
         
-        field_value = get_nested_value(result, field_path)
+        for key, field_schema in schema['properties'].items():
+            field_path = f"{prefix}.{key}" if prefix else key
+            value = node.get(key) if isinstance(node, dict) else None
+            
+            if 'properties' in field_schema:
+                self._collect_field_confidences(value, field_schema, field_path, field_confidences)
+            else:
+                field_confidences[field_path] = self._score_field_value(value, field_schema)
+    
+    def _score_field_value(self, field_value: Any, field_schema: dict) -> float:
+        """Score a field's value against its schema."""
         confidence = 1.0
         
         # Check if field exists
@@ -357,8 +1005,7 @@ class ExtractionEngine:
         
         # Check string patterns
         if expected_type == 'string' and 'pattern' in field_schema:
-            import re
-            if not re.match(field_schema['pattern'], str(field_value)):
+            if not _compile_pattern(field_schema['pattern']).search(str(field_value)):
                 confidence *= 0.7
         
         # Check numeric ranges
@@ -427,6 +1074,52 @@ class ExtractionEngine:
         
         return level_schema
     
+    def _plan_chunk_waves(self, sorted_chunks: List[dict]) -> List[List[dict]]:
+        """
+        Split ordered schema chunks into waves of mutually independent chunks.
+        
+        A chunk starts a new wave when one of its dependencies falls under a
+        top-level property of a chunk already in the current wave.
+        """
+        waves = []
+        wave_keys = set()
+        
+        for chunk_info in sorted_chunks:
+            dependency_keys = {dep.split('.', 1)[0] for dep in chunk_info['dependencies']}
+            if not waves or dependency_keys & wave_keys:
+                waves.append([])
+                wave_keys = set()
+            waves[-1].append(chunk_info)
+            wave_keys.update(chunk_info['schema'].get('properties', {}))
+        
+        return waves
+    
+    def _plan_chunk_packs(self, wave: List[dict], text_tokens: int) -> List[List[dict]]:
+        """
+        Group a wave's chunks into shared requests.
+        
+        A pack's schemas stay within max_pack_schema_tokens, and with the text
+        within max_tokens_per_request, so a wave still fans out over several
+        concurrent requests with bounded responses.
+        """
+        if len(wave) == 1:
+            return [wave]
+        
+        packs = []
+        pack_schema_tokens = 0
+        
+        for chunk_info in wave:
+            schema_tokens = estimate_schema_tokens(chunk_info['schema'])
+            if (not packs
+                    or pack_schema_tokens + schema_tokens > self.max_pack_schema_tokens
+                    or text_tokens + pack_schema_tokens + schema_tokens > self.max_tokens_per_request):
+                packs.append([])
+                pack_schema_tokens = 0
+            packs[-1].append(chunk_info)
+            pack_schema_tokens += schema_tokens
+        
+        return packs
+    
     def _build_chunk_context(self, previous_results: dict, dependencies: List[str]) -> str:
         """Build context string from previous extraction results."""
         if not previous_results or not dependencies:
@@ -434,15 +1127,11 @@ class ExtractionEngine:
         
         context_data = {}
         for dep in dependencies:
-            try:
-                from utils import get_nested_value
-            except ImportError:
-                from .utils import get_nested_value
             value = get_nested_value(previous_results, dep)
             if value is not None:
                 context_data[dep] = value
         
         if context_data:
-            return f"Previously extracted data: {json.dumps(context_data, indent=2)}"
+            return f"Previously extracted data: {indented_json(context_data)}"
         
         return ""
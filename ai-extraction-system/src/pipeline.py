@@ -0,0 +1,141 @@
+"""End-to-end extraction pipeline combining all system components."""
+from concurrent.futures import Executor
+from typing import Any, Callable, Iterator, Tuple
+try:
+    from schema_analyzer import SchemaAnalyzer
+    from extraction_engine import ExtractionEngine
+    from document_processor import DocumentProcessor
+    from confidence_scorer import ConfidenceScorer
+except ImportError:
+    from .schema_analyzer import SchemaAnalyzer
+    from .extraction_engine import ExtractionEngine
+    from .document_processor import DocumentProcessor
+    from .confidence_scorer import ConfidenceScorer
+
+# Chunk fields holding document text, left out of described documents
+_CHUNK_TEXT_KEYS = frozenset(('text', 'first_sentence', 'last_sentence'))
+
+
+class ExtractionPipeline:
+    """Runs schema analysis, document processing, extraction and scoring as one pass."""
+    
+    def __init__(self, extraction_engine: ExtractionEngine = None,
+                 document_processor: DocumentProcessor = None,
+                 confidence_scorer: ConfidenceScorer = None,
+                 schema_analyzer: SchemaAnalyzer = None,
+                 cpu_executor: Executor = None):
+        self.extraction_engine = extraction_engine or ExtractionEngine()
+        self.document_processor = document_processor or DocumentProcessor()
+        self.confidence_scorer = confidence_scorer or ConfidenceScorer()
+        self.schema_analyzer = schema_analyzer or self.extraction_engine.schema_analyzer
+        # Optional (typically process-based) executor for CPU-bound stages, so
+        # chunking and scoring don't hold the GIL against other requests
+        self.cpu_executor = cpu_executor
+    
+    def run(self, schema: dict, text: str, batch: bool = False, schema_analysis: dict = None) -> dict:
+        """
+        Extract data from text and score it.
+        
+        Args:
+            schema: JSON schema defining the expected output structure
+            text: Input document text
+            batch: Submit document chunks, or a chunked schema's requests, through the OpenAI Batch API
+            schema_analysis: Precomputed analyze_complexity result for the schema
+            
+        Returns:
+            dict: Extracted data, confidence analysis and processing metadata
+        """
+        for event, payload in self.iter_run(schema, text, batch, schema_analysis):
+            pass
+        return payload
+    
+    def iter_run(self, schema: dict, text: str, batch: bool = False,
+                 schema_analysis: dict = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Run the pipeline, yielding (event, payload) pairs as stages finish.
+        
+        Events are 'schema_analysis', then one 'chunk' per document chunk for
+        chunked documents, and finally 'complete' with the same result run()
+        returns. The schema analysis is computed once and shared with the
+        extraction engine instead of being recomputed for every call.
+        """
+        if schema_analysis is None:
+            schema_analysis = self.schema_analyzer.analyze_complexity(schema)
+        yield 'schema_analysis', schema_analysis
+        
+        # Process document if needed
+        doc_info = self._run_cpu_bound(self.document_processor.process_document, text, schema)
+        
+        if doc_info['needs_chunking'] and batch:
+            # Non-interactive callers can trade latency for Batch API pricing
+            chunk_results = self.extraction_engine.extract_batch(
+                [chunk['text'] for chunk in doc_info['chunks']], schema,
+                analysis=schema_analysis
+            )
+            final_result = self.document_processor.merge_extractions(chunk_results)
+        elif doc_info['needs_chunking']:
+            # Handle large documents, extracting all chunks concurrently
+            total_chunks = doc_info['total_chunks']
+            chunk_results = [None] * total_chunks
+            completed = 0
+            
+            for index, chunk_result in self.extraction_engine.iter_extract_chunks(
+                    [chunk['text'] for chunk in doc_info['chunks']], schema,
+                    analysis=schema_analysis):
+                chunk_results[index] = chunk_result
+                completed += 1
+                yield 'chunk', {
+                    'chunk_id': index,
+                    'completed': completed,
+                    'total_chunks': total_chunks,
+                    'result': chunk_result
+                }
+            
+            # Merge results from all chunks
+            final_result = self.document_processor.merge_extractions(chunk_results)
+        else:
+            # Single extraction
+            final_result = self.extraction_engine.extract(
+                text, schema, analysis=schema_analysis, batch=batch
+            )
+        
+        # Enhanced confidence scoring
+        enhanced_confidence = self._run_cpu_bound(
+            self.confidence_scorer.score_extraction, final_result['data'], schema, text
+        )
+        
+        # Combine all results
+        response = {
+            'data': final_result['data'],
+            'confidence': enhanced_confidence,
+            'strategy': final_result['strategy'],
+            'token_usage': final_result.get('token_usage', 0),
+            'schema_analysis': schema_analysis,
+            'document_info': self._describe_document(doc_info),
+            'processing_time': None  # Could add timing if needed
+        }
+        if 'error' in final_result:
+            response['error'] = final_result['error']
+        
+        yield 'complete', response
+    
+    @staticmethod
+    def _describe_document(doc_info: dict) -> dict:
+        """
+        Copy processing metadata without the chunk texts.
+        
+        Chunks hold (overlapping) copies of the whole document, which would
+        otherwise be echoed back in every response and kept in result caches.
+        """
+        described = dict(doc_info)
+        described['chunks'] = [
+            {key: value for key, value in chunk.items() if key not in _CHUNK_TEXT_KEYS}
+            for chunk in doc_info['chunks']
+        ]
+        return described
+    
+    def _run_cpu_bound(self, func: Callable, *args) -> Any:
+        """Run a CPU-bound stage on the configured executor, or inline without one."""
+        if self.cpu_executor is None:
+            return func(*args)
+        return self.cpu_executor.submit(func, *args).result()
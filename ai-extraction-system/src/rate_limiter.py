@@ -0,0 +1,64 @@
+"""Client-side rate limiting of OpenAI requests."""
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token buckets for requests and tokens per minute, shared by sync and async callers.
+    
+    Each call takes its share of capacity up front, letting a bucket go into
+    debt, and then waits until the debt would have been refilled. Later
+    callers queue behind the debt, which spaces requests out just under the
+    quota rather than bursting into 429s. A limit of 0 leaves that bucket off.
+    """
+    
+    def __init__(self, max_requests_per_minute: float = 0, max_tokens_per_minute: float = 0):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.available_request_capacity = float(max_requests_per_minute)
+        self.available_token_capacity = float(max_tokens_per_minute)
+        self._last_update = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @property
+    def limits_tokens(self) -> bool:
+        """Whether acquire needs a token estimate."""
+        return self.max_tokens_per_minute > 0
+    
+    def acquire(self, tokens: int = 0):
+        """Block until a request of about this many tokens fits the quota."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def acquire_async(self, tokens: int = 0):
+        """Async counterpart of acquire."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _reserve(self, tokens: int) -> float:
+        """Take capacity for one request, returning how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_update
+            self._last_update = now
+            
+            delay = 0.0
+            if self.max_requests_per_minute > 0:
+                rate = self.max_requests_per_minute / 60
+                self.available_request_capacity = min(
+                    self.max_requests_per_minute, self.available_request_capacity + elapsed * rate
+                ) - 1
+                delay = max(delay, -self.available_request_capacity / rate)
+            if self.max_tokens_per_minute > 0:
+                rate = self.max_tokens_per_minute / 60
+                # A request bigger than the whole bucket can only wait for a full one
+                self.available_token_capacity = min(
+                    self.max_tokens_per_minute, self.available_token_capacity + elapsed * rate
+                ) - min(tokens, self.max_tokens_per_minute)
+                delay = max(delay, -self.available_token_capacity / rate)
+            
+            return delay
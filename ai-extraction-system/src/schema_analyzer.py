@@ -1,24 +1,35 @@
 """Schema Analysis Engine for complex JSON schema handling."""
-import json
 from typing import Dict, List, Tuple, Any
 try:
     from utils import (
-        estimate_schema_tokens, calculate_schema_depth, count_schema_objects,
-        count_enum_values, flatten_schema
+        estimate_schema_tokens, get_flattened_schema, schema_metrics, IdentityCache,
+        count_tokens_batch, canonical_json
     )
 except ImportError:
     from .utils import (
-        estimate_schema_tokens, calculate_schema_depth, count_schema_objects,
-        count_enum_values, flatten_schema
+        estimate_schema_tokens, get_flattened_schema, schema_metrics, IdentityCache,
+        count_tokens_batch, canonical_json
     )
 
 
 class SchemaAnalyzer:
-    """Analyzes JSON schemas and provides extraction strategies."""
+    """
+    Analyzes JSON schemas and provides extraction strategies.
+    
+    Per-schema results are memoized by object identity, so a schema must not
+    be mutated once it has been analyzed.
+    """
     
     def __init__(self, max_tokens_per_chunk: int = 100000):
         # Updated for GPT-4.1's 1M token limit - schemas can be much larger now
         self.max_tokens_per_chunk = max_tokens_per_chunk
+        # chunk_schema needs both of these, and get_extraction_order needs the
+        # graph too, so they are memoized per schema object
+        self._dependency_graphs = IdentityCache(self._build_dependency_graph)
+        self._extraction_orders = IdentityCache(self._build_extraction_order)
+        # Analysis, strategy selection and chunking all start from the token
+        # estimate, which serializes and tokenizes the whole schema
+        self._schema_tokens = IdentityCache(estimate_schema_tokens)
     
     def analyze_complexity(self, schema: dict) -> dict:
         """
@@ -27,13 +38,14 @@ class SchemaAnalyzer:
         Returns:
             dict: Complexity analysis with metrics and strategy recommendation
         """
+        structure = schema_metrics(schema)
         metrics = {
-            'max_depth': calculate_schema_depth(schema),
-            'total_fields': len(flatten_schema(schema)),
-            'object_count': count_schema_objects(schema),
-            'enum_complexity': count_enum_values(schema),
-            'estimated_tokens': estimate_schema_tokens(schema),
-            'required_fields': self._count_required_fields(schema)
+            'max_depth': structure['max_depth'],
+            'total_fields': structure['total_fields'],
+            'object_count': structure['object_count'],
+            'enum_complexity': structure['enum_complexity'],
+            'estimated_tokens': self._schema_tokens(schema),
+            'required_fields': structure['required_fields']
         }
         
         # Calculate complexity score (0-100)
@@ -49,15 +61,34 @@ class SchemaAnalyzer:
             'needs_chunking': metrics['estimated_tokens'] > self.max_tokens_per_chunk
         }
     
+    def quick_strategy(self, schema: dict) -> str:
+        """
+        Pick the extraction strategy analyze_complexity would, computing only what it needs.
+        
+        Returns:
+            str: The extraction strategy
+        """
+        if self._schema_tokens(schema) > self.max_tokens_per_chunk:
+            return 'multi_pass_chunked'
+        if self._has_multiple_objects(schema):
+            return 'multi_pass_hierarchical'
+        return 'single_pass'
+    
     def build_dependency_graph(self, schema: dict) -> dict:
         """
         Build a dependency graph for schema fields.
         
+        The graph is memoized per schema object; neither may be mutated.
+        
         Returns:
             dict: Dependency mapping for ordered extraction
         """
+        return self._dependency_graphs(schema)
+    
+    def _build_dependency_graph(self, schema: dict) -> dict:
+        """Build the dependency graph build_dependency_graph memoizes."""
         dependencies = {}
-        flattened = flatten_schema(schema)
+        flattened = get_flattened_schema(schema)
         
         for field_path, field_schema in flattened.items():
             dependencies[field_path] = {
@@ -83,7 +114,7 @@ class SchemaAnalyzer:
         if max_tokens is None:
             max_tokens = self.max_tokens_per_chunk
         
-        estimated_tokens = estimate_schema_tokens(schema)
+        estimated_tokens = self._schema_tokens(schema)
         
         if estimated_tokens <= max_tokens:
             return [{
@@ -106,37 +137,46 @@ class SchemaAnalyzer:
         """
         Determine optimal field extraction order based on dependencies.
         
+        The order is memoized per schema object; neither may be mutated.
+        
         Returns:
             List of field paths in extraction order
         """
+        return self._extraction_orders(schema)
+    
+    def _build_extraction_order(self, schema: dict) -> List[str]:
+        """Compute the field order get_extraction_order memoizes."""
         dependencies = self.build_dependency_graph(schema)
         
-        # Topological sort based on dependencies
+        # Topological sort based on dependencies: an iterative depth-first
+        # walk, so deep dependency chains can't hit the recursion limit.
+        # Each stack entry is a field and the iterator over its dependencies.
         ordered_fields = []
         visited = set()
-        temp_visited = set()
-        
-        def visit(field):
-            if field in temp_visited:
-                # Circular dependency - add to end
-                return
-            if field in visited:
-                return
-            
-            temp_visited.add(field)
+        in_progress = set()
+        
+        for root in dependencies:
+            if root in visited:
+                continue
             
-            # Visit dependencies first
-            for dep in dependencies.get(field, {}).get('depends_on', []):
-                if dep in dependencies:
-                    visit(dep)
+            in_progress.add(root)
+            stack = [(root, iter(dependencies[root]['depends_on']))]
             
-            temp_visited.remove(field)
-            visited.add(field)
-            ordered_fields.append(field)
-        
-        for field in dependencies:
-            if field not in visited:
-                visit(field)
+            while stack:
+                field, pending = stack[-1]
+                
+                # Visit dependencies first; one still in progress is a circular
+                # dependency and is skipped
+                for dep in pending:
+                    if dep in dependencies and dep not in visited and dep not in in_progress:
+                        in_progress.add(dep)
+                        stack.append((dep, iter(dependencies[dep]['depends_on'])))
+                        break
+                else:
+                    stack.pop()
+                    in_progress.remove(field)
+                    visited.add(field)
+                    ordered_fields.append(field)
         
         return ordered_fields
     
@@ -171,18 +211,28 @@ class SchemaAnalyzer:
         else:
             return 'single_pass'
     
-    def _count_required_fields(self, schema: dict, path: str = "") -> int:
-        """Count required fields in schema."""
-        count = 0
-        
-        if 'required' in schema and isinstance(schema['required'], list):
-            count += len(schema['required'])
-        
-        if 'properties' in schema:
-            for key, value in schema['properties'].items():
-                count += self._count_required_fields(value, f"{path}.{key}" if path else key)
+    def _has_multiple_objects(self, schema: dict) -> bool:
+        """
+        Whether object_count (as schema_metrics counts it) is above 1.
         
-        return count
+        Nesting deeper than one level implies at least two objects, so this
+        covers the max_depth check too, and the walk stops at the second object.
+        """
+        object_count = 0
+        stack = [schema]
+        
+        while stack:
+            node = stack.pop()
+            if 'properties' not in node:
+                continue
+            for value in node['properties'].values():
+                if 'properties' in value or value.get('type') == 'object':
+                    object_count += 1
+                    if object_count > 1:
+                        return True
+                stack.append(value)
+        
+        return False
     
     def _find_dependencies(self, field_path: str, field_schema: dict, all_fields: dict) -> List[str]:
         """Find dependencies for a field based on schema references."""
@@ -205,16 +255,23 @@ class SchemaAnalyzer:
     def _extract_field_references(self, schema_part: dict) -> List[str]:
         """Extract field references from schema part."""
         references = []
-        
-        if isinstance(schema_part, dict):
-            for key, value in schema_part.items():
-                if key == 'properties' and isinstance(value, dict):
-                    references.extend(value.keys())
-                elif isinstance(value, (dict, list)):
-                    references.extend(self._extract_field_references(value))
-        elif isinstance(schema_part, list):
-            for item in schema_part:
-                references.extend(self._extract_field_references(item))
+        # Walk depth-first with a stack of (key, value) iterators, keeping the
+        # order references appear in; the root and list items have no key
+        stack = [iter([(None, schema_part)])]
+        
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                continue
+            
+            key, value = entry
+            if key == 'properties' and isinstance(value, dict):
+                references.extend(value.keys())
+            elif isinstance(value, dict):
+                stack.append(iter(value.items()))
+            elif isinstance(value, list):
+                stack.append((None, item) for item in value)
         
         return references
     
@@ -222,45 +279,52 @@ class SchemaAnalyzer:
         """Create schema chunks based on dependency analysis."""
         chunks = []
         current_chunk = {'properties': {}}
+        current_fields = []  # Paths of the fields added to current_chunk
         current_tokens = 0
         chunk_id = 0
         
         # Sort fields by dependency level and importance
         ordered_fields = self.get_extraction_order(schema)
+        flattened = get_flattened_schema(schema)
         
-        for field_path in ordered_fields:
-            field_parts = field_path.split('.')
-            field_schema = self._get_field_schema(schema, field_parts)
-            field_tokens = estimate_schema_tokens({field_path: field_schema})
-            
+        # Same estimate as estimate_schema_tokens({field_path: field_schema}),
+        # tokenized for all fields in one batch
+        field_token_counts = count_tokens_batch([
+            canonical_json({field_path: flattened[field_path]})
+            for field_path in ordered_fields
+        ])
+        
+        for field_path, field_tokens in zip(ordered_fields, field_token_counts):
             # Check if adding this field would exceed token limit
-            if current_tokens + field_tokens > max_tokens and current_chunk['properties']:
+            if current_tokens + field_tokens > max_tokens and current_fields:
                 # Finalize current chunk
                 chunks.append({
                     'schema': current_chunk,
                     'chunk_id': chunk_id,
                     'total_chunks': 0,  # Will be updated later
-                    'dependencies': self._get_chunk_dependencies(current_chunk, dependencies),
-                    'priority': self._calculate_chunk_priority(current_chunk, dependencies)
+                    'dependencies': self._get_chunk_dependencies(current_fields, dependencies),
+                    'priority': self._calculate_chunk_priority(current_fields, dependencies)
                 })
                 
                 # Start new chunk
                 current_chunk = {'properties': {}}
+                current_fields = []
                 current_tokens = 0
                 chunk_id += 1
             
             # Add field to current chunk
-            self._add_field_to_chunk(current_chunk, field_parts, field_schema)
+            self._add_field_to_chunk(current_chunk, field_path.split('.'), flattened[field_path])
+            current_fields.append(field_path)
             current_tokens += field_tokens
         
         # Add final chunk if not empty
-        if current_chunk['properties']:
+        if current_fields:
             chunks.append({
                 'schema': current_chunk,
                 'chunk_id': chunk_id,
                 'total_chunks': 0,
-                'dependencies': self._get_chunk_dependencies(current_chunk, dependencies),
-                'priority': self._calculate_chunk_priority(current_chunk, dependencies)
+                'dependencies': self._get_chunk_dependencies(current_fields, dependencies),
+                'priority': self._calculate_chunk_priority(current_fields, dependencies)
             })
         
         # Update total_chunks count
@@ -270,18 +334,6 @@ class SchemaAnalyzer:
         
         return chunks
     
-    def _get_field_schema(self, schema: dict, field_parts: List[str]) -> dict:
-        """Get schema for a specific field path."""
-        current = schema
-        
-        for part in field_parts:
-            if 'properties' in current and part in current['properties']:
-                current = current['properties'][part]
-            else:
-                return {}
-        
-        return current
-    
     def _add_field_to_chunk(self, chunk: dict, field_parts: List[str], field_schema: dict):
         """Add a field to a chunk schema."""
         current = chunk
@@ -297,9 +349,9 @@ class SchemaAnalyzer:
             current['properties'] = {}
         current['properties'][field_parts[-1]] = field_schema
     
-    def _get_chunk_dependencies(self, chunk: dict, dependencies: dict) -> List[str]:
-        """Get dependencies for a chunk."""
-        chunk_fields = set(flatten_schema(chunk).keys())
+    def _get_chunk_dependencies(self, chunk_fields: List[str], dependencies: dict) -> List[str]:
+        """Get dependencies for a chunk from the paths of its fields."""
+        chunk_fields = set(chunk_fields)
         chunk_deps = set()
         
         for field in chunk_fields:
@@ -310,10 +362,9 @@ class SchemaAnalyzer:
         
         return list(chunk_deps)
     
-    def _calculate_chunk_priority(self, chunk: dict, dependencies: dict) -> str:
-        """Calculate priority for a chunk."""
-        chunk_fields = flatten_schema(chunk)
-        required_count = sum(1 for field, schema in chunk_fields.items() 
+    def _calculate_chunk_priority(self, chunk_fields: List[str], dependencies: dict) -> str:
+        """Calculate priority for a chunk from the paths of its fields."""
+        required_count = sum(1 for field in chunk_fields
                            if dependencies.get(field, {}).get('required', False))
         
         if required_count > len(chunk_fields) * 0.7:
@@ -2,11 +2,13 @@
 """
 Test script for the AI Text-to-JSON Extraction System.
 This script tests the core functionality without requiring an OpenAI API key.
+The tests are plain assert functions, so pytest can also collect them.
 """
 
 import json
 import sys
 import os
+from functools import lru_cache
 
 # Add the src directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -16,21 +18,33 @@ from document_processor import DocumentProcessor
 from confidence_scorer import ConfidenceScorer
 from utils import (
     count_tokens, estimate_schema_tokens, validate_json_against_schema,
-    flatten_schema, calculate_schema_depth, count_schema_objects,
-    count_enum_values
+    get_schema_validator, flatten_schema, calculate_schema_depth, count_schema_objects,
+    count_enum_values, schema_metrics, parse_json
 )
 
 
+# Fixtures are shared by several tests; read and parse each file once.
+# Callers must not mutate the returned schemas.
+@lru_cache(maxsize=None)
+def _load_json(path: str):
+    with open(path, 'rb') as f:
+        return parse_json(f.read())
+
+
+@lru_cache(maxsize=None)
+def _load_text(path: str) -> str:
+    with open(path, 'r') as f:
+        return f.read()
+
+
 def test_schema_analyzer():
     """Test the Schema Analyzer component."""
     print("🔍 Testing Schema Analyzer...")
     
     # Load test schema
-    with open('test_cases/simple_schema.json', 'r') as f:
-        simple_schema = json.load(f)
+    simple_schema = _load_json('test_cases/simple_schema.json')
     
-    with open('test_cases/complex_schema.json', 'r') as f:
-        complex_schema = json.load(f)
+    complex_schema = _load_json('test_cases/complex_schema.json')
     
     analyzer = SchemaAnalyzer()
     
@@ -39,6 +53,9 @@ def test_schema_analyzer():
     print(f"  Simple Schema - Complexity Score: {simple_analysis['complexity_score']}")
     print(f"  Simple Schema - Strategy: {simple_analysis['strategy']}")
     print(f"  Simple Schema - Max Depth: {simple_analysis['metrics']['max_depth']}")
+    assert simple_analysis['strategy'] == 'single_pass'
+    assert simple_analysis['metrics']['max_depth'] == 0
+    assert simple_analysis['metrics']['total_fields'] == 6
     
     # Test complex schema
     complex_analysis = analyzer.analyze_complexity(complex_schema)
@@ -46,14 +63,18 @@ def test_schema_analyzer():
     print(f"  Complex Schema - Strategy: {complex_analysis['strategy']}")
     print(f"  Complex Schema - Max Depth: {complex_analysis['metrics']['max_depth']}")
     print(f"  Complex Schema - Total Fields: {complex_analysis['metrics']['total_fields']}")
+    assert complex_analysis['strategy'] == 'multi_pass_hierarchical'
+    assert complex_analysis['metrics']['max_depth'] == 3
+    assert complex_analysis['metrics']['total_fields'] == 15
+    assert not complex_analysis['needs_chunking']
     
     # Test chunking
     if complex_analysis['needs_chunking']:
         chunks = analyzer.chunk_schema(complex_schema)
         print(f"  Complex Schema - Chunks: {len(chunks)}")
+        assert chunks
     
     print("  ✅ Schema Analyzer tests passed!")
-    return True
 
 
 def test_document_processor():
@@ -61,14 +82,11 @@ def test_document_processor():
     print("\n📄 Testing Document Processor...")
     
     # Load test documents
-    with open('test_cases/sample_documents/simple_text.txt', 'r') as f:
-        simple_text = f.read()
+    simple_text = _load_text('test_cases/sample_documents/simple_text.txt')
     
-    with open('test_cases/sample_documents/complex_text.txt', 'r') as f:
-        complex_text = f.read()
+    complex_text = _load_text('test_cases/sample_documents/complex_text.txt')
     
-    with open('test_cases/simple_schema.json', 'r') as f:
-        schema = json.load(f)
+    schema = _load_json('test_cases/simple_schema.json')
     
     processor = DocumentProcessor()
     
@@ -81,12 +99,14 @@ def test_document_processor():
     complex_doc_info = processor.process_document(complex_text, schema)
     print(f"  Complex Text - Needs Chunking: {complex_doc_info['needs_chunking']}")
     print(f"  Complex Text - Total Tokens: {complex_doc_info['total_tokens']}")
+    assert not simple_doc_info['needs_chunking'] and simple_doc_info['total_chunks'] == 1
+    assert not complex_doc_info['needs_chunking'] and complex_doc_info['total_chunks'] == 1
+    assert complex_doc_info['total_tokens'] > simple_doc_info['total_tokens']
     
     if complex_doc_info['needs_chunking']:
         print(f"  Complex Text - Chunks: {complex_doc_info['total_chunks']}")
     
     print("  ✅ Document Processor tests passed!")
-    return True
 
 
 def test_confidence_scorer():
@@ -94,8 +114,7 @@ def test_confidence_scorer():
     print("\n🎯 Testing Confidence Scorer...")
     
     # Load test schema
-    with open('test_cases/simple_schema.json', 'r') as f:
-        schema = json.load(f)
+    schema = _load_json('test_cases/simple_schema.json')
     
     # Mock extraction result
     mock_result = {
@@ -115,13 +134,17 @@ def test_confidence_scorer():
     print(f"  Schema Valid: {confidence_analysis['schema_valid']}")
     print(f"  Field Scores: {len(confidence_analysis['fields'])} fields analyzed")
     print(f"  Review Candidates: {len(confidence_analysis['review_candidates'])}")
+    assert confidence_analysis['schema_valid'] is True
+    assert sorted(confidence_analysis['fields']) == ['active', 'age', 'email', 'name', 'occupation', 'skills']
+    # Neither string appears in the stand-in text
+    assert [candidate['field'] for candidate in confidence_analysis['review_candidates']] == ['name', 'occupation']
     
     # Test individual field scoring
     field_score = scorer.score_field("john.smith@techcorp.com", schema['properties']['email'])
     print(f"  Email Field Score: {field_score:.2f}")
+    assert field_score == 1.0
     
     print("  ✅ Confidence Scorer tests passed!")
-    return True
 
 
 def test_utils():
@@ -129,8 +152,7 @@ def test_utils():
     print("\n🛠️ Testing Utility Functions...")
     
     # Load test schema
-    with open('test_cases/complex_schema.json', 'r') as f:
-        schema = json.load(f)
+    schema = _load_json('test_cases/complex_schema.json')
     
     # Test token counting
     test_text = "This is a test sentence for token counting."
@@ -149,18 +171,31 @@ def test_utils():
     print(f"  Schema Depth: {depth}")
     print(f"  Schema Objects: {objects}")
     print(f"  Enum Values: {enums}")
+    assert (depth, objects, enums) == (3, 7, 52)
     
     # Test schema flattening
     flattened = flatten_schema(schema)
     print(f"  Flattened Fields: {len(flattened)}")
+    assert len(flattened) == 15
+    
+    # Test single-pass metrics agree with the individual walks
+    metrics = schema_metrics(schema)
+    assert metrics['max_depth'] == depth
+    assert metrics['object_count'] == objects
+    assert metrics['enum_complexity'] == enums
+    assert metrics['total_fields'] == len(flattened)
+    print(f"  Single-pass Metrics: {metrics}")
     
     # Test validation
     test_data = {"company": {"name": "Test Corp", "industry": "Technology"}}
     is_valid, error = validate_json_against_schema(test_data, schema)
     print(f"  Validation Test: {'✅ Valid' if is_valid else '❌ Invalid'}")
+    assert is_valid is True and error == ""
+    
+    # Test the compiled validator is reused for the same schema
+    assert get_schema_validator(schema) is get_schema_validator(json.loads(json.dumps(schema)))
     
     print("  ✅ Utility function tests passed!")
-    return True
 
 
 def test_integration():
@@ -168,11 +203,9 @@ def test_integration():
     print("\n🔗 Testing Component Integration...")
     
     # Load test data
-    with open('test_cases/simple_schema.json', 'r') as f:
-        schema = json.load(f)
+    schema = _load_json('test_cases/simple_schema.json')
     
-    with open('test_cases/sample_documents/simple_text.txt', 'r') as f:
-        text = f.read()
+    text = _load_text('test_cases/sample_documents/simple_text.txt')
     
     # Test full pipeline (without OpenAI API)
     analyzer = SchemaAnalyzer()
@@ -182,10 +215,12 @@ def test_integration():
     # Analyze schema
     schema_analysis = analyzer.analyze_complexity(schema)
     print(f"  Schema Analysis: {schema_analysis['strategy']} strategy recommended")
+    assert schema_analysis['strategy'] == 'single_pass'
     
     # Process document
     doc_info = processor.process_document(text, schema)
     print(f"  Document Processing: {doc_info['total_chunks']} chunk(s)")
+    assert doc_info['total_chunks'] == 1
     
     # Mock extraction result for confidence testing
     mock_result = {
@@ -200,9 +235,11 @@ def test_integration():
     # Score confidence
     confidence = scorer.score_extraction(mock_result, schema, text)
     print(f"  Confidence Scoring: {confidence['overall']:.2f} overall confidence")
+    assert confidence['schema_valid'] is True
+    # Every value is found in the source document
+    assert confidence['review_candidates'] == []
     
     print("  ✅ Integration tests passed!")
-    return True
 
 
 def main():
@@ -221,10 +258,11 @@ def main():
     passed = 0
     total = len(tests)
     
+    # Sequential, so the fixture and analysis caches are shared across tests
     for test in tests:
         try:
-            if test():
-                passed += 1
+            test()
+            passed += 1
         except Exception as e:
             print(f"  ❌ Test failed with error: {e}")
     
@@ -1,42 +1,188 @@
 """Utility functions for the extraction system."""
+import hashlib
+import os
 import tiktoken
 import json
-from typing import Any, Dict, List, Tuple
-from jsonschema import validate, ValidationError
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from jsonschema import validators
+from jsonschema.exceptions import best_match
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
-def count_tokens(text: str, model: str = "gpt-4") -> int:
-    """Count tokens in text for a given model."""
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """Get the tiktoken encoding for a model."""
     try:
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
+        return tiktoken.encoding_for_model(model)
     except KeyError:
         # Fallback to cl100k_base encoding if model not found
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return len(encoding.encode(text))
+        return tiktoken.get_encoding("cl100k_base")
+
+
+# Token counts keyed by (model, digest of the text) rather than the text, so
+# memoizing whole documents doesn't keep them alive
+_TOKEN_COUNT_CACHE_SIZE = 4096
+_token_counts = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """
+    Count tokens in text for a given model.
+    
+    Counts are memoized, so re-counting the same schema or document only
+    costs a hash of the text rather than another BPE encoding.
+    """
+    key = (model, hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest())
+    with _token_counts_lock:
+        count = _token_counts.get(key)
+        if count is not None:
+            _token_counts.move_to_end(key)
+            return count
+    
+    count = len(_get_encoding(model).encode(text))
+    with _token_counts_lock:
+        _token_counts[key] = count
+        while len(_token_counts) > _TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+# tiktoken encodes a batch on a thread pool outside the GIL; size it to the machine
+_ENCODE_THREADS = os.cpu_count() or 4
+
+
+def count_tokens_batch(texts: List[str], model: str = "gpt-4") -> List[int]:
+    """Count tokens for many texts with one batched tiktoken call."""
+    encoded = _get_encoding(model).encode_batch(texts, num_threads=_ENCODE_THREADS)
+    return [len(tokens) for tokens in encoded]
 
 
 def estimate_schema_tokens(schema: dict, model: str = "gpt-4") -> int:
     """Estimate token count for a JSON schema."""
-    schema_str = json.dumps(schema, indent=2)
-    return count_tokens(schema_str, model)
+    # Serialized the way prompts carry it, compact and canonical
+    return count_tokens(canonical_json(schema), model)
+
+
+def canonical_json(data: Any) -> str:
+    """Serialize data to a canonical JSON string suitable for hashing."""
+    if orjson is not None:
+        # orjson's compact, key-sorted output matches the json fallback below
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def indented_json(data: Any) -> str:
+    """Serialize data as 2-space indented JSON, for prompts."""
+    if orjson is not None:
+        # Matches the json fallback below byte for byte
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def parse_json(text: str) -> Any:
+    """Parse JSON text, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+@lru_cache(maxsize=256)
+def _compile_validator(schema_key: str):
+    """Check a schema against its metaschema and build its validator."""
+    schema = json.loads(schema_key)
+    validator_class = validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+def get_schema_validator(schema: dict):
+    """
+    Get a validator for a schema, memoized per schema.
+    
+    Raises jsonschema's SchemaError if the schema itself is invalid.
+    """
+    return _compile_validator(get_schema_json(schema))
+
+
+def _node_violation(instance: Any, schema: Any) -> Optional[str]:
+    """Check one instance for a missing required property or a bad array length."""
+    # Draft 7 and earlier ignore keywords next to $ref; leave those to the validator
+    if not isinstance(schema, dict) or '$ref' in schema:
+        return None
+    
+    if isinstance(instance, dict):
+        required = schema.get('required')
+        if isinstance(required, list):
+            for key in required:
+                if key not in instance:
+                    return f"{key!r} is a required property"
+    elif isinstance(instance, list):
+        min_items = schema.get('minItems')
+        if isinstance(min_items, int) and len(instance) < min_items:
+            return f"Expected at least {min_items} items, got {len(instance)}"
+        max_items = schema.get('maxItems')
+        if isinstance(max_items, int) and len(instance) > max_items:
+            return f"Expected at most {max_items} items, got {len(instance)}"
+    
+    return None
+
+
+def _shallow_violation(data: Any, schema: dict) -> Optional[str]:
+    """
+    Look for a cheap-to-find violation at the top level or one level down.
+    
+    Partial extractions usually miss required properties near the top, which
+    this finds without a full validation walking every nested field.
+    """
+    problem = _node_violation(data, schema)
+    if problem is not None or not isinstance(data, dict) or '$ref' in schema:
+        return problem
+    
+    properties = schema.get('properties')
+    if isinstance(properties, dict):
+        for key, subschema in properties.items():
+            if key in data:
+                problem = _node_violation(data[key], subschema)
+                if problem is not None:
+                    return f"{problem} (in {key!r})"
+    
+    return None
 
 
 def validate_json_against_schema(data: dict, schema: dict) -> Tuple[bool, str]:
     """Validate JSON data against a schema."""
-    try:
-        validate(instance=data, schema=schema)
+    validator = get_schema_validator(schema)
+    
+    problem = _shallow_violation(data, schema)
+    if problem is not None:
+        return False, problem
+    
+    # Same error selection as jsonschema.validate, without re-checking the
+    # schema against its metaschema on every call
+    error = best_match(validator.iter_errors(data))
+    if error is None:
         return True, ""
-    except ValidationError as e:
-        return False, str(e)
+    return False, str(error)
+
+
+@lru_cache(maxsize=4096)
+def _split_path(path: str) -> Tuple[str, ...]:
+    """Split a dotted path into its keys, once per distinct path."""
+    return tuple(path.split('.'))
 
 
 def get_nested_value(data: dict, path: str, default=None):
     """Get nested value from dictionary using dot notation."""
-    keys = path.split('.')
     current = data
     
-    for key in keys:
+    for key in _split_path(path):
         if isinstance(current, dict) and key in current:
             current = current[key]
         else:
@@ -47,7 +193,7 @@ def get_nested_value(data: dict, path: str, default=None):
 
 def set_nested_value(data: dict, path: str, value: Any):
     """Set nested value in dictionary using dot notation."""
-    keys = path.split('.')
+    keys = _split_path(path)
     current = data
     
     for key in keys[:-1]:
@@ -61,30 +207,114 @@ def set_nested_value(data: dict, path: str, value: Any):
 def flatten_schema(schema: dict, prefix: str = "") -> Dict[str, dict]:
     """Flatten a nested schema into a flat dictionary with dot notation keys."""
     flattened = {}
+    if 'properties' not in schema:
+        return flattened
     
-    if 'properties' in schema:
-        for key, value in schema['properties'].items():
-            full_key = f"{prefix}.{key}" if prefix else key
+    # Depth-first with a stack of (prefix, property iterator) pairs, so fields
+    # come out in the same order as a recursive walk
+    stack = [(prefix, iter(schema['properties'].items()))]
+    while stack:
+        node_prefix, properties = stack[-1]
+        for key, value in properties:
+            full_key = f"{node_prefix}.{key}" if node_prefix else key
             
             if 'properties' in value:
                 # Nested object
-                flattened.update(flatten_schema(value, full_key))
-            else:
-                # Leaf field
-                flattened[full_key] = value
+                stack.append((full_key, iter(value['properties'].items())))
+                break
+            # Leaf field
+            flattened[full_key] = value
+        else:
+            stack.pop()
     
     return flattened
 
 
+class IdentityCache:
+    """
+    LRU memo for a one-argument function, keyed by the argument's identity.
+    
+    Meant for unhashable inputs (like schema dicts) that are reused as the
+    same object. Entries keep a reference to their argument, so an id can't
+    be reused while it is cached. Arguments must not be mutated after their
+    first lookup, and cached results are shared between callers.
+    """
+    
+    def __init__(self, func: Callable[[Any], Any], maxsize: int = 256):
+        self.func = func
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __call__(self, obj: Any) -> Any:
+        key = id(obj)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is obj:
+                self._entries.move_to_end(key)
+                return entry[1]
+        
+        value = self.func(obj)
+        with self._lock:
+            self._entries[key] = (obj, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+
+_flattened_schemas = IdentityCache(flatten_schema)
+
+
+def get_flattened_schema(schema: dict) -> Dict[str, dict]:
+    """
+    Memoized flatten_schema for a schema object that is scored repeatedly.
+    
+    The schema must not be mutated afterwards, nor the returned dict.
+    """
+    return _flattened_schemas(schema)
+
+
+_schema_jsons = IdentityCache(canonical_json)
+
+
+def get_schema_json(schema: dict) -> str:
+    """
+    Memoized canonical_json for a schema object that is serialized repeatedly.
+    
+    The schema must not be mutated afterwards.
+    """
+    return _schema_jsons(schema)
+
+
+_schema_fingerprints = IdentityCache(
+    lambda schema: hashlib.sha256(get_schema_json(schema).encode('utf-8')).hexdigest()
+)
+
+
+def get_schema_fingerprint(schema: dict) -> str:
+    """
+    Memoized SHA-256 hex digest of a schema's canonical JSON.
+    
+    The schema must not be mutated afterwards.
+    """
+    return _schema_fingerprints(schema)
+
+
 def calculate_schema_depth(schema: dict, current_depth: int = 0) -> int:
     """Calculate the maximum depth of a JSON schema."""
     max_depth = current_depth
+    stack = [(schema, current_depth)]
     
-    if 'properties' in schema:
-        for value in schema['properties'].values():
-            if 'properties' in value:
-                depth = calculate_schema_depth(value, current_depth + 1)
-                max_depth = max(max_depth, depth)
+    while stack:
+        node, depth = stack.pop()
+        if depth > max_depth:
+            max_depth = depth
+        properties = node.get('properties')
+        if properties:
+            for value in properties.values():
+                if 'properties' in value:
+                    stack.append((value, depth + 1))
     
     return max_depth
 
@@ -92,12 +322,15 @@ def calculate_schema_depth(schema: dict, current_depth: int = 0) -> int:
 def count_schema_objects(schema: dict) -> int:
     """Count the number of object types in a schema."""
     count = 0
+    stack = [schema]
     
-    if 'properties' in schema:
-        for value in schema['properties'].values():
-            if value.get('type') == 'object' or 'properties' in value:
-                count += 1
-                count += count_schema_objects(value)
+    while stack:
+        properties = stack.pop().get('properties')
+        if properties:
+            for value in properties.values():
+                if 'properties' in value or value.get('type') == 'object':
+                    count += 1
+                    stack.append(value)
     
     return count
 
@@ -105,28 +338,121 @@ def count_schema_objects(schema: dict) -> int:
 def count_enum_values(schema: dict) -> int:
     """Count total enum values in a schema."""
     count = 0
+    stack = [schema]
     
-    if 'enum' in schema:
-        count += len(schema['enum'])
+    while stack:
+        node = stack.pop()
+        # 'items' may be a list of schemas, which contributes nothing
+        if not isinstance(node, dict):
+            continue
+        enum = node.get('enum')
+        if enum is not None:
+            count += len(enum)
+        properties = node.get('properties')
+        if properties:
+            stack.extend(properties.values())
+        if 'items' in node:
+            stack.append(node['items'])
     
-    if 'properties' in schema:
-        for value in schema['properties'].values():
-            count += count_enum_values(value)
+    return count
+
+
+def schema_metrics(schema: dict) -> Dict[str, int]:
+    """
+    Compute structural schema metrics in a single iterative walk.
     
-    if 'items' in schema:
-        count += count_enum_values(schema['items'])
+    Returns the same numbers as calculate_schema_depth, len(flatten_schema),
+    count_schema_objects, count_enum_values and a count of 'required' entries,
+    without walking the schema once per metric.
+    """
+    max_depth = 0
+    total_fields = 0
+    object_count = 0
+    enum_count = 0
+    required_count = 0
     
-    return count
+    # Nodes reached only through 'properties' shape the object tree; nodes under
+    # 'items' only contribute enum values.
+    stack = [(schema, 0, True)]
+    while stack:
+        node, depth, in_object_tree = stack.pop()
+        
+        if 'enum' in node:
+            enum_count += len(node['enum'])
+        if 'items' in node:
+            stack.append((node['items'], depth, False))
+        
+        if in_object_tree:
+            required = node.get('required')
+            if isinstance(required, list):
+                required_count += len(required)
+        
+        if 'properties' not in node:
+            continue
+        
+        if in_object_tree:
+            if depth > max_depth:
+                max_depth = depth
+            for value in node['properties'].values():
+                if 'properties' in value:
+                    object_count += 1
+                else:
+                    total_fields += 1
+                    if value.get('type') == 'object':
+                        object_count += 1
+        
+        for value in node['properties'].values():
+            stack.append((value, depth + 1, in_object_tree))
+    
+    return {
+        'max_depth': max_depth,
+        'total_fields': total_fields,
+        'object_count': object_count,
+        'enum_complexity': enum_count,
+        'required_fields': required_count
+    }
 
 
 def merge_dicts_deep(dict1: dict, dict2: dict) -> dict:
     """Deep merge two dictionaries."""
     result = dict1.copy()
+    # Explicit stack of (copied target, source) pairs instead of recursion;
+    # only dicts present on both sides are copied
+    stack = [(result, dict2)]
     
-    for key, value in dict2.items():
-        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-            result[key] = merge_dicts_deep(result[key], value)
-        else:
-            result[key] = value
+    while stack:
+        target, source = stack.pop()
+        for key, value in source.items():
+            existing = target.get(key)
+            if isinstance(existing, dict) and isinstance(value, dict):
+                merged = target[key] = existing.copy()
+                stack.append((merged, value))
+            else:
+                target[key] = value
     
     return result
+
+
+def merge_dicts_deep_into(target: dict, source: dict) -> dict:
+    """
+    Deep merge source into target in place, returning target.
+    
+    Gives the same result as merge_dicts_deep(target, source) without copying
+    target, so accumulating many results costs their size rather than the
+    size of everything merged so far. Dicts from source are copied on the way
+    in, so later merges into target never modify source.
+    """
+    stack = [(target, source)]
+    
+    while stack:
+        node, source_node = stack.pop()
+        for key, value in source_node.items():
+            if isinstance(value, dict):
+                existing = node.get(key)
+                if not isinstance(existing, dict):
+                    existing = node[key] = {}
+                stack.append((existing, value))
+            else:
+                node[key] = value
+    
+    return target
@@ -0,0 +1,242 @@
+// File upload handlers
+document.getElementById('schemaFile').addEventListener('change', function(e) {
+    const file = e.target.files[0];
+    if (file) {
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            document.getElementById('schema').value = e.target.result;
+        };
+        reader.readAsText(file);
+    }
+});
+
+document.getElementById('textFile').addEventListener('change', function(e) {
+    const file = e.target.files[0];
+    if (file) {
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            document.getElementById('text').value = e.target.result;
+        };
+        reader.readAsText(file);
+    }
+});
+
+// Form submission
+document.getElementById('extractionForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    const schema = document.getElementById('schema').value;
+    const text = document.getElementById('text').value;
+
+    if (!schema || !text) {
+        showError('Please provide both schema and text.');
+        return;
+    }
+
+    // Validate JSON schema
+    try {
+        JSON.parse(schema);
+    } catch (e) {
+        showError('Invalid JSON schema: ' + e.message);
+        return;
+    }
+
+    showLoading(true);
+    hideError();
+    hideResults();
+
+    try {
+        const response = await fetch('/extract/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                schema: JSON.parse(schema),
+                text: text
+            })
+        });
+
+        if (response.ok) {
+            await readEventStream(response, handleExtractionEvent);
+        } else {
+            const result = await response.json();
+            showError(result.error || 'An error occurred during extraction.');
+        }
+    } catch (error) {
+        showError('Network error: ' + error.message);
+    } finally {
+        showLoading(false);
+    }
+});
+
+// Clear button
+document.getElementById('clearBtn').addEventListener('click', function() {
+    document.getElementById('schema').value = '';
+    document.getElementById('text').value = '';
+    document.getElementById('schemaFile').value = '';
+    document.getElementById('textFile').value = '';
+    hideResults();
+    hideError();
+});
+
+// Read Server-Sent Events from a streaming fetch response
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            });
+
+            if (data) {
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+}
+
+function handleExtractionEvent(event, payload) {
+    if (event === 'schema_analysis') {
+        setLoadingMessage(`Schema analyzed (${payload.strategy}). Extracting data...`);
+    } else if (event === 'chunk') {
+        setLoadingMessage(`Extracted chunk ${payload.completed} of ${payload.total_chunks}...`);
+    } else if (event === 'complete') {
+        displayResults(payload);
+    } else if (event === 'error') {
+        showError(payload.error || 'An error occurred during extraction.');
+    }
+}
+
+const DEFAULT_LOADING_MESSAGE = document.getElementById('loading').textContent.trim();
+
+function setLoadingMessage(message) {
+    document.getElementById('loading').textContent = message;
+}
+
+function showLoading(show) {
+    if (show) {
+        setLoadingMessage(DEFAULT_LOADING_MESSAGE);
+    }
+    document.getElementById('loading').style.display = show ? 'block' : 'none';
+    document.getElementById('extractBtn').disabled = show;
+}
+
+function showError(message) {
+    const errorDiv = document.getElementById('error');
+    errorDiv.textContent = message;
+    errorDiv.style.display = 'block';
+}
+
+function hideError() {
+    document.getElementById('error').style.display = 'none';
+}
+
+function hideResults() {
+    document.getElementById('results').style.display = 'none';
+}
+
+function displayResults(result) {
+    // Show results container
+    document.getElementById('results').style.display = 'block';
+
+    // Display extracted data
+    document.getElementById('extractedData').textContent = JSON.stringify(result.data, null, 2);
+
+    // Display overall confidence
+    const confidence = result.confidence.overall;
+    const confidenceClass = confidence >= 0.8 ? 'confidence-high' : 
+                          confidence >= 0.6 ? 'confidence-medium' : 'confidence-low';
+    document.getElementById('overallConfidence').innerHTML = 
+        `<span class="confidence-score ${confidenceClass}">${(confidence * 100).toFixed(1)}%</span>`;
+
+    // Display confidence details
+    displayConfidenceDetails(result.confidence);
+
+    // Display schema metrics
+    displaySchemaMetrics(result.schema_analysis);
+
+    // Display raw response
+    document.getElementById('rawResponse').textContent = JSON.stringify(result, null, 2);
+}
+
+function displayConfidenceDetails(confidence) {
+    let html = '<h4>Field Confidence Scores:</h4>';
+
+    for (const [field, score] of Object.entries(confidence.fields)) {
+        const confidenceClass = score >= 0.8 ? 'confidence-high' : 
+                              score >= 0.6 ? 'confidence-medium' : 'confidence-low';
+        html += `<div><strong>${field}:</strong> <span class="confidence-score ${confidenceClass}">${(score * 100).toFixed(1)}%</span></div>`;
+    }
+
+    if (confidence.completion) {
+        html += '<h4>Completion Metrics:</h4>';
+        html += `<div>Fields Completed: ${confidence.completion.completed_fields}/${confidence.completion.total_fields} (${(confidence.completion.completion_rate * 100).toFixed(1)}%)</div>`;
+        html += `<div>Required Fields: ${confidence.completion.completed_required}/${confidence.completion.required_fields} (${(confidence.completion.required_completion_rate * 100).toFixed(1)}%)</div>`;
+    }
+
+    document.getElementById('confidenceDetails').innerHTML = html;
+
+    // Display review candidates
+    if (confidence.review_candidates && confidence.review_candidates.length > 0) {
+        let reviewHtml = '<div class="review-candidates"><h4>⚠️ Fields Needing Review:</h4>';
+        confidence.review_candidates.forEach(candidate => {
+            reviewHtml += `<div><strong>${candidate.field}</strong> (${(candidate.confidence * 100).toFixed(1)}%) - ${candidate.reason}</div>`;
+        });
+        reviewHtml += '</div>';
+        document.getElementById('reviewCandidates').innerHTML = reviewHtml;
+    } else {
+        document.getElementById('reviewCandidates').innerHTML = '<div style="color: green;">✅ All fields meet confidence threshold</div>';
+    }
+}
+
+function displaySchemaMetrics(analysis) {
+    if (!analysis) return;
+
+    const metrics = analysis.metrics;
+    let html = '';
+
+    html += `<div class="metric-card"><div class="metric-value">${metrics.max_depth}</div><div class="metric-label">Max Depth</div></div>`;
+    html += `<div class="metric-card"><div class="metric-value">${metrics.total_fields}</div><div class="metric-label">Total Fields</div></div>`;
+    html += `<div class="metric-card"><div class="metric-value">${metrics.object_count}</div><div class="metric-label">Objects</div></div>`;
+    html += `<div class="metric-card"><div class="metric-value">${metrics.enum_complexity}</div><div class="metric-label">Enum Values</div></div>`;
+    html += `<div class="metric-card"><div class="metric-value">${analysis.complexity_score}</div><div class="metric-label">Complexity Score</div></div>`;
+    html += `<div class="metric-card"><div class="metric-value">${analysis.strategy}</div><div class="metric-label">Strategy Used</div></div>`;
+
+    document.getElementById('schemaMetrics').innerHTML = html;
+}
+
+function showTab(tabName) {
+    // Hide all tab contents
+    document.querySelectorAll('.tab-content').forEach(content => {
+        content.classList.remove('active');
+    });
+
+    // Remove active class from all tabs
+    document.querySelectorAll('.tab').forEach(tab => {
+        tab.classList.remove('active');
+    });
+
+    // Show selected tab content
+    document.getElementById(tabName).classList.add('active');
+
+    // Add active class to clicked tab
+    event.target.classList.add('active');
+}
@@ -2,7 +2,7 @@
 import json
 import os
 from dotenv import load_dotenv
-from src import ExtractionEngine, SchemaAnalyzer, DocumentProcessor, ConfidenceScorer
+from src import ExtractionEngine, SchemaAnalyzer, DocumentProcessor, ConfidenceScorer, indented_json
 
 # Load environment variables
 load_dotenv()
@@ -71,7 +71,7 @@ def test_complex_5level_extraction():
     engine = ExtractionEngine()
     
     try:
-        result = engine.extract(architecture_text, schema)
+        result = engine.extract(architecture_text, schema, analysis=analysis)
         
         print("\n✅ Extraction Complete!")
         print(f"  Strategy Used: {result.get('strategy', 'unknown')}")
@@ -174,43 +174,42 @@ def test_complex_5level_extraction():
                                                 validation = col['constraints']['validation']
                                                 print(f"                Validation: {len(validation)} rules")
         
-        # Confidence analysis
+        # Confidence analysis; the scorer's report includes the overall score
+        # and schema validity, so the extraction is scored only once
         print("\n🎯 Confidence Analysis:")
-        confidence = result.get('confidence', {})
+        scorer = ConfidenceScorer()
+        confidence = scorer.score_extraction(extracted_data, schema, architecture_text)
         print(f"  Overall Confidence: {confidence.get('overall', 0):.2%}")
         print(f"  Schema Valid: {confidence.get('schema_valid', False)}")
         
-        # Detailed confidence scoring
-        scorer = ConfidenceScorer()
-        full_confidence = scorer.score_extraction(extracted_data, schema, architecture_text)
-        
         print(f"\n📈 Detailed Confidence Metrics:")
-        completion = full_confidence.get('completion', {})
+        completion = confidence.get('completion', {})
         print(f"  Completion Rate: {completion.get('completion_rate', 0):.1%}")
         print(f"  Required Fields: {completion.get('completed_required', 0)}/{completion.get('required_fields', 0)}")
         
-        consistency = full_confidence.get('consistency', {})
+        consistency = confidence.get('consistency', {})
         print(f"  Type Consistency: {consistency.get('type_consistency', 0):.1%}")
         print(f"  Enum Consistency: {consistency.get('enum_consistency', 0):.1%}")
         
         # Review candidates
-        review_candidates = full_confidence.get('review_candidates', [])
+        review_candidates = confidence.get('review_candidates', [])
         if review_candidates:
             print(f"\n🔍 Fields Needing Review ({len(review_candidates)}):")
+            lines = []
             for candidate in review_candidates[:8]:  # Show top 8
-                field_parts = candidate['field'].split('.')
-                level = len(field_parts)
-                print(f"    Level {level}: {candidate['field']}")
-                print(f"      Confidence: {candidate['confidence']:.1%} ({candidate['reason']})")
+                level = candidate['field'].count('.') + 1
+                lines.append(f"    Level {level}: {candidate['field']}")
+                lines.append(f"      Confidence: {candidate['confidence']:.1%} ({candidate['reason']})")
+            print("\n".join(lines))
         else:
             print("\n✨ Excellent! No fields need review - high confidence extraction!")
         
         # Save results
         output_file = 'test_cases/enterprise_5level_extraction_result.json'
-        with open(output_file, 'w') as f:
-            json.dump({
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(indented_json({
                 'extracted_data': extracted_data,
-                'confidence': full_confidence,
+                'confidence': confidence,
                 'analysis': {
                     'schema_complexity': analysis,
                     'document_info': {
@@ -220,7 +219,7 @@ def test_complex_5level_extraction():
                     'extraction_strategy': result.get('strategy'),
                     'token_usage': result.get('token_usage', 0)
                 }
-            }, f, indent=2)
+            }))
         
         print(f"\n💾 Results saved to: {output_file}")
         
@@ -1,20 +1,105 @@
 """Test script for resume extraction using the JSON Resume Schema."""
-import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from src import ExtractionEngine, SchemaAnalyzer, DocumentProcessor, ConfidenceScorer
+from src import (
+    ExtractionCache, SchemaAnalyzer, DocumentProcessor, ConfidenceScorer, indented_json, parse_json
+)
 
 # Load environment variables
 load_dotenv()
 
+# Re-runs on unchanged input are served from here instead of the API;
+# set NO_EXTRACTION_CACHE=1 to force fresh requests
+_CACHE_DIR = 'test_cases/.extraction_cache'
+
+# Resume section headings and the schema property each one fills
+_SECTION_PROPERTIES = {
+    'WORK EXPERIENCE': 'work',
+    'VOLUNTEER EXPERIENCE': 'volunteer',
+    'EDUCATION': 'education',
+    'AWARDS': 'awards',
+    'CERTIFICATIONS': 'certificates',
+    'PUBLICATIONS': 'publications',
+    'TECHNICAL SKILLS': 'skills',
+    'SKILLS': 'skills',
+    'LANGUAGES': 'languages',
+    'INTERESTS': 'interests',
+    'REFERENCES': 'references',
+    'PROJECTS': 'projects',
+    'META INFORMATION': 'meta'
+}
+_SECTION_HEADING = re.compile(
+    r'^[ \t]*(' + '|'.join(_SECTION_PROPERTIES) + r')[ \t]*:?[ \t]*$',
+    re.MULTILINE | re.IGNORECASE
+)
+
+
+def split_resume_sections(text: str) -> dict:
+    """
+    Split a resume at its section headings, keyed by schema property.
+    
+    Everything before the first heading is the 'basics' section.
+    """
+    headings = list(_SECTION_HEADING.finditer(text))
+    sections = {'basics': text[:headings[0].start()] if headings else text}
+    for heading, following in zip(headings, headings[1:] + [None]):
+        end = following.start() if following else len(text)
+        name = _SECTION_PROPERTIES[heading.group(1).upper()]
+        sections[name] = sections.get(name, '') + text[heading.start():end]
+    return sections
+
+
+def extract_by_section(engine, text: str, schema: dict) -> dict:
+    """
+    Extract each resume section with only its own text and schema property.
+    
+    Sections are sent with the basics block for context, concurrently.
+    Properties without a heading of their own share one call over the
+    whole text.
+    """
+    sections = split_resume_sections(text)
+    basics = sections['basics']
+    properties = schema['properties']
+    
+    requests = [
+        ([name], basics if name == 'basics' else basics + '\n' + sections[name])
+        for name in properties if name in sections
+    ]
+    unsectioned = [name for name in properties if name not in sections]
+    if unsectioned:
+        requests.append((unsectioned, text))
+    
+    def extract_request(request):
+        names, snippet = request
+        # Top-level keywords such as definitions stay so $refs still resolve
+        sub_schema = dict(schema, properties={name: properties[name] for name in names})
+        sub_schema.pop('required', None)
+        return engine.extract(snippet, sub_schema)
+    
+    with ThreadPoolExecutor(max_workers=min(len(requests), engine.max_concurrent_requests)) as executor:
+        results = list(executor.map(extract_request, requests))
+    
+    data = {}
+    for result in results:
+        data.update(result.get('data') or {})
+    return {
+        'data': data,
+        'strategy': 'sectioned',
+        'token_usage': sum(result.get('token_usage', 0) for result in results),
+        'section_results': results
+    }
+
+
 def test_resume_extraction():
     """Test extraction with resume schema and sample text."""
     print("🚀 Testing Resume Extraction System")
     print("=" * 60)
     
     # Load schema and text
-    with open('test_cases/resume_schema.json', 'r') as f:
-        schema = json.load(f)
+    with open('test_cases/resume_schema.json', 'rb') as f:
+        schema = parse_json(f.read())
     
     with open('test_cases/sample_documents/resume_sample.txt', 'r') as f:
         resume_text = f.read()
@@ -45,67 +130,88 @@ def test_resume_extraction():
         return
     
     print("\n🔄 Performing Extraction...")
-    engine = ExtractionEngine()
+    # Imported only once there is an API key to use; it pulls in the OpenAI client
+    from src import ExtractionEngine
+    cache = None
+    if not os.getenv('NO_EXTRACTION_CACHE'):
+        cache = ExtractionCache(os.getenv('EXTRACTION_CACHE_DIR') or _CACHE_DIR)
+    engine = ExtractionEngine(cache=cache)
     
     try:
-        result = engine.extract(resume_text, schema)
+        if doc_info['needs_chunking']:
+            # Chunks are extracted concurrently, then merged in document order
+            chunk_results = engine.extract_chunks(
+                [chunk['text'] for chunk in doc_info['chunks']], schema, analysis=analysis
+            )
+            result = processor.merge_extractions(chunk_results)
+        elif len(split_resume_sections(resume_text)) > 1:
+            # Each section only needs its own text, not the whole resume
+            result = extract_by_section(engine, resume_text, schema)
+        else:
+            result = engine.extract(resume_text, schema, analysis=analysis)
         
         print("\n✅ Extraction Complete!")
         print(f"  Strategy Used: {result.get('strategy', 'unknown')}")
         print(f"  Token Usage: {result.get('token_usage', 0)}")
         
-        # Display extracted data
-        print("\n📊 Extracted Data:")
+        # Display extracted data; the report is collected and printed in one write
         extracted_data = result.get('data', {})
+        lines = ["\n📊 Extracted Data:"]
         
         # Show key fields
         if 'basics' in extracted_data:
             basics = extracted_data['basics']
-            print(f"\n  Basic Information:")
-            print(f"    Name: {basics.get('name', 'N/A')}")
-            print(f"    Label: {basics.get('label', 'N/A')}")
-            print(f"    Email: {basics.get('email', 'N/A')}")
-            print(f"    Phone: {basics.get('phone', 'N/A')}")
+            lines += [
+                "\n  Basic Information:",
+                f"    Name: {basics.get('name', 'N/A')}",
+                f"    Label: {basics.get('label', 'N/A')}",
+                f"    Email: {basics.get('email', 'N/A')}",
+                f"    Phone: {basics.get('phone', 'N/A')}"
+            ]
             
             if 'location' in basics:
                 loc = basics['location']
-                print(f"    Location: {loc.get('city', '')}, {loc.get('region', '')} {loc.get('countryCode', '')}")
+                lines.append(f"    Location: {loc.get('city', '')}, {loc.get('region', '')} {loc.get('countryCode', '')}")
         
         if 'work' in extracted_data and extracted_data['work']:
-            print(f"\n  Work Experience: {len(extracted_data['work'])} positions found")
+            lines.append(f"\n  Work Experience: {len(extracted_data['work'])} positions found")
             for i, job in enumerate(extracted_data['work'][:2]):  # Show first 2
-                print(f"    {i+1}. {job.get('position', 'N/A')} at {job.get('name', 'N/A')}")
+                lines.append(f"    {i+1}. {job.get('position', 'N/A')} at {job.get('name', 'N/A')}")
         
         if 'education' in extracted_data and extracted_data['education']:
-            print(f"\n  Education: {len(extracted_data['education'])} degrees found")
+            lines.append(f"\n  Education: {len(extracted_data['education'])} degrees found")
             for edu in extracted_data['education']:
-                print(f"    - {edu.get('studyType', 'N/A')} in {edu.get('area', 'N/A')} from {edu.get('institution', 'N/A')}")
+                lines.append(f"    - {edu.get('studyType', 'N/A')} in {edu.get('area', 'N/A')} from {edu.get('institution', 'N/A')}")
         
         if 'skills' in extracted_data and extracted_data['skills']:
-            print(f"\n  Skills: {len(extracted_data['skills'])} skill categories found")
+            lines.append(f"\n  Skills: {len(extracted_data['skills'])} skill categories found")
+        
+        print("\n".join(lines))
         
-        # Confidence analysis
+        # Confidence analysis; the scorer's report includes the overall score
+        # and schema validity, so the extraction is scored only once
         print("\n🎯 Confidence Analysis:")
-        confidence = result.get('confidence', {})
+        scorer = ConfidenceScorer()
+        confidence = scorer.score_extraction(extracted_data, schema, resume_text)
         print(f"  Overall Confidence: {confidence.get('overall', 0):.2%}")
         print(f"  Schema Valid: {confidence.get('schema_valid', False)}")
         
         # Review candidates
-        scorer = ConfidenceScorer()
-        full_confidence = scorer.score_extraction(extracted_data, schema, resume_text)
-        review_candidates = full_confidence.get('review_candidates', [])
+        review_candidates = confidence.get('review_candidates', [])
         
         if review_candidates:
             print(f"\n  Fields Needing Review ({len(review_candidates)}):")
-            for candidate in review_candidates[:5]:  # Show top 5
-                print(f"    - {candidate['field']}: {candidate['confidence']:.2%} ({candidate['reason']})")
+            print("\n".join(
+                f"    - {candidate['field']}: {candidate['confidence']:.2%} ({candidate['reason']})"
+                for candidate in review_candidates[:5]  # Show top 5
+            ))
         else:
             print("  No fields need review - high confidence extraction!")
         
         # Save results
         output_file = 'test_cases/resume_extraction_result.json'
-        with open(output_file, 'w') as f:
-            json.dump({
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(indented_json({
                 'extracted_data': extracted_data,
                 'confidence': confidence,
                 'analysis': {
@@ -115,7 +221,7 @@ def test_resume_extraction():
                         'needs_chunking': doc_info['needs_chunking']
                     }
                 }
-            }, f, indent=2)
+            }))
         
         print(f"\n💾 Results saved to: {output_file}")
         